@@ -13,7 +13,7 @@ class CTkScrollableDropdown(customtkinter.CTkToplevel):
                  fg_color=None, button_height: int = 20, justify="center", scrollbar_button_color=None,
                  scrollbar=True, scrollbar_button_hover_color=None, frame_border_width=2, values=[],
                  command=None, image_values=[], alpha: float = 0.97, frame_corner_radius=20, double_click=False,
-                 resize=True, frame_border_color=None, text_color=None, autocomplete=False, **button_kwargs):
+                 resize=True, frame_border_color=None, text_color=None, autocomplete=False, search=None, **button_kwargs):
         
         super().__init__(takefocus=1)
         
@@ -77,6 +77,8 @@ class CTkScrollableDropdown(customtkinter.CTkToplevel):
         self.fade = False
         self.resize = resize
         self.autocomplete = autocomplete
+        # Optional function that returns the values matching a string in the order they are shown, used instead of startswith
+        self.search = search
         self.var_update = customtkinter.StringVar()
         self.appear = False
         
@@ -167,6 +169,7 @@ class CTkScrollableDropdown(customtkinter.CTkToplevel):
     def _init_buttons(self, **button_kwargs):
         self.i = 0
         self.widgets = {}
+        self.value_widgets = {}
         for row in self.values:                                
             self.widgets[self.i] = customtkinter.CTkButton(self.frame,
                                                           text=row,
@@ -177,8 +180,10 @@ class CTkScrollableDropdown(customtkinter.CTkToplevel):
                                                           anchor=self.justify,
                                                           command=lambda k=row: self._attach_key_press(k), **button_kwargs)
             self.widgets[self.i].pack(fill="x", pady=2, padx=(self.padding, 0))
+            self.value_widgets.setdefault(row, self.i)
             self.i+=1
              
+        self.shown = list(self.widgets.keys())
         self.hide = False
             
     def destroy_popup(self):
@@ -234,14 +239,24 @@ class CTkScrollableDropdown(customtkinter.CTkToplevel):
         if self.fade: return
         if string:
             self._deiconify()
-            i=1
-            for key in self.widgets.keys():
-                s = self.widgets[key].cget("text")
-                if not s.startswith(string):
+            if self.search is not None:
+                # Only the buttons that were shown and the matches are touched, so this doesn't slow down with more values
+                matches = [self.value_widgets[value] for value in self.search(string) if value in self.value_widgets]
+                for key in self.shown:
                     self.widgets[key].pack_forget()
-                else:
+                for key in matches:
                     self.widgets[key].pack(fill="x", pady=2, padx=(self.padding, 0))
-                    i+=1
+                self.shown = matches
+            else:
+                self.shown = []
+                for key in self.widgets.keys():
+                    s = self.widgets[key].cget("text")
+                    if not s.startswith(string):
+                        self.widgets[key].pack_forget()
+                    else:
+                        self.widgets[key].pack(fill="x", pady=2, padx=(self.padding, 0))
+                        self.shown.append(key)
+            i = len(self.shown) + 1
                     
             if i==1:
                 self.no_match.pack(fill="x", pady=2, padx=(self.padding, 0))
@@ -270,6 +285,8 @@ class CTkScrollableDropdown(customtkinter.CTkToplevel):
                                                        anchor=self.justify,
                                                        command=lambda k=value: self._attach_key_press(k), **kwargs)
         self.widgets[self.i].pack(fill="x", pady=2, padx=(self.padding, 0))
+        self.value_widgets.setdefault(value, self.i)
+        self.shown.append(self.i)
         self.i+=1
         self.values.append(value)
         
@@ -291,6 +308,9 @@ class CTkScrollableDropdown(customtkinter.CTkToplevel):
         if "alpha" in kwargs:
             self.alpha = kwargs.pop("alpha")
             
+        if "search" in kwargs:
+            self.search = kwargs.pop("search")
+            
         if "width" in kwargs:
             self.width = kwargs.pop("width")
             
@@ -0,0 +1,262 @@
+"""
+Generate a synthetic Imperator game and mod folder that the editor can load without a real game install.
+
+The game folder gets common/* files for every GameObject type the editor loads.
+The mod folder replaces some of those files and adds new ones, and holds setup/provinces,
+map_data/definition.csv and map_data/provinces.png for the requested number of provinces.
+
+Run from the repository root:
+    python benchmarks/mod_tree.py /tmp/mod_tree --provinces 10000
+"""
+import argparse
+import math
+import os
+import random
+import struct
+import zlib
+
+POP_TYPES = ["nobles", "citizen", "freemen", "tribesmen", "slaves"]
+PROVINCE_RANKS = ["settlement", "city", "city_metropolis"]
+# Provinces in each setup file, the game splits its provinces over files by region
+PROVINCES_PER_SETUP_FILE = 1000
+# Objects in each common file
+OBJECTS_PER_FILE = 50
+# Cultures in each culture group
+CULTURES_PER_GROUP = 10
+
+
+def province_color(province_id):
+    # Multiplying by an odd number is a bijection modulo 2^24, so every province gets a unique color that is never black
+    color = (province_id * 0x9E3779) & 0xFFFFFF
+    return color >> 16, (color >> 8) & 0xFF, color & 0xFF
+
+
+def write_file(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8-sig", newline="\n") as file:
+        file.write(text)
+    return os.path.getsize(path)
+
+
+def get_object_counts(provinces):
+    # Bigger maps have more of everything, with a floor so small trees still look like a game
+    return {
+        "buildings": max(20, provinces // 100),
+        "cultures": max(30, provinces // 20),
+        "religions": max(10, provinces // 500),
+        "terrain_types": max(12, provinces // 1000),
+        "trade_goods": max(20, provinces // 500),
+    }
+
+
+def get_object_names(provinces):
+    counts = get_object_counts(provinces)
+    names = {
+        "buildings": [f"building_{i}_building" for i in range(counts["buildings"])],
+        "cultures": [f"culture_{i}" for i in range(counts["cultures"])],
+        "religions": [f"religion_{i}" for i in range(counts["religions"])],
+        "terrain_types": [f"terrain_{i}" for i in range(counts["terrain_types"])],
+        "trade_goods": [f"trade_good_{i}" for i in range(counts["trade_goods"])],
+        "pop_types": list(POP_TYPES),
+        "province_ranks": list(PROVINCE_RANKS),
+    }
+    return names
+
+
+def building_script(name, rng):
+    return (
+        f"{name} = {{\n"
+        "\tallow = {\n"
+        "\t\tOR = {\n"
+        "\t\t\thas_city_status = yes\n"
+        f"\t\t\tnum_of_{name} < {rng.randint(1, 5)}\n"
+        "\t\t}\n"
+        "\t}\n"
+        f"\tcost = {rng.randint(10, 200)}\n"
+        f"\ttime = {rng.randint(30, 365)}\n"
+        "\tmodifier = {\n"
+        f"\t\tlocal_population_growth = 0.0{rng.randint(1, 9)}\n"
+        "\t\tlocal_building_slot = 1\n"
+        "\t}\n"
+        "\tai_will_do = { factor = 1 }\n"
+        "}\n\n"
+    )
+
+
+def culture_group_script(group, cultures, rng):
+    text = [
+        f"{group} = {{\n",
+        f"\tcolor = rgb {{ {rng.randint(0, 255)} {rng.randint(0, 255)} {rng.randint(0, 255)} }}\n",
+        "\tfamily = {\n\t\tJul.Julia.Julii.Julia\n\t\tCor.Cornelia.Cornelii.Cornelia\n\t}\n",
+        "\tculture = {\n",
+    ]
+    for culture in cultures:
+        text.append(f"\t\t{culture} = {{\n\t\t\tmale_names = {{ Marcus Gaius Lucius }}\n\t\t}}\n")
+    text.append("\t}\n}\n\n")
+    return "".join(text)
+
+
+def block_script(name, rng):
+    # Religions, pop types, province ranks, terrain and trade goods all look like this as far as key scanning is concerned
+    return (
+        f"{name} = {{\n"
+        f"\tcolor = rgb {{ {rng.randint(0, 255)} {rng.randint(0, 255)} {rng.randint(0, 255)} }}\n"
+        "\tmodifier = {\n"
+        f"\t\tlocal_tax_modifier = 0.0{rng.randint(1, 9)}\n"
+        "\t}\n"
+        f"\tvalue = {rng.randint(1, 10)}\n"
+        "}\n\n"
+    )
+
+
+def get_common_scripts(names, rng):
+    # Return {type: [file text, ...]} for every GameObject type
+    scripts = dict()
+    for object_type, object_names in names.items():
+        if object_type == "cultures":
+            groups = [
+                object_names[i : i + CULTURES_PER_GROUP] for i in range(0, len(object_names), CULTURES_PER_GROUP)
+            ]
+            blocks = [culture_group_script(f"culture_group_{i}", group, rng) for i, group in enumerate(groups)]
+            per_file = max(1, OBJECTS_PER_FILE // CULTURES_PER_GROUP)
+        else:
+            script = building_script if object_type == "buildings" else block_script
+            blocks = [script(name, rng) for name in object_names]
+            per_file = OBJECTS_PER_FILE
+        header = "@base_value = 10\n\n"
+        scripts[object_type] = [header + "".join(blocks[i : i + per_file]) for i in range(0, len(blocks), per_file)]
+    return scripts
+
+
+def province_script(province_id, names, rng):
+    text = [
+        f"{province_id}={{ # Province {province_id}\n",
+        f'\tterrain="{rng.choice(names["terrain_types"])}"\n',
+        f'\tculture="{rng.choice(names["cultures"])}"\n',
+        f'\treligion="{rng.choice(names["religions"])}"\n',
+        f'\ttrade_goods="{rng.choice(names["trade_goods"])}"\n',
+        f"\tcivilization_value={rng.randint(0, 60)}\n",
+        f"\tbarbarian_power={rng.randint(0, 5)}\n",
+        f'\tprovince_rank="{rng.choice(PROVINCE_RANKS)}"\n',
+    ]
+    for pop_type in rng.sample(POP_TYPES, rng.randint(0, 4)):
+        text.append(f"\t{pop_type}={{\n")
+        if rng.random() < 0.3:
+            text.append(f'\t\tculture="{rng.choice(names["cultures"])}"\n')
+        if rng.random() < 0.3:
+            text.append(f'\t\treligion="{rng.choice(names["religions"])}"\n')
+        text.append(f"\t\tamount={rng.randint(1, 12)}\n")
+        text.append("\t}\n")
+    if rng.random() < 0.02:
+        text.append(f'\tholy_site="deity_{province_id}"\n')
+    for building in rng.sample(names["buildings"], rng.randint(0, 3)):
+        text.append(f"\t{building}={rng.randint(1, 3)}\n")
+    text.append("}\n")
+    return "".join(text)
+
+
+def write_png(path, width, height, rows):
+    # Write an 8 bit RGB png, rows is an iterable of the raw bytes of each row
+    def chunk(tag, data):
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+
+    compressor = zlib.compressobj(6)
+    data = [compressor.compress(b"\x00" + row) for row in rows]
+    data.append(compressor.flush())
+    with open(path, "wb") as file:
+        file.write(b"\x89PNG\r\n\x1a\n")
+        file.write(chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+        file.write(chunk(b"IDAT", b"".join(data)))
+        file.write(chunk(b"IEND", b""))
+    return os.path.getsize(path)
+
+
+def province_map_rows(provinces, columns, cell_size):
+    # Every province is a square cell in a grid, cells after the last province are black
+    rows = math.ceil(provinces / columns)
+    for row in range(rows):
+        cells = list()
+        for column in range(columns):
+            province_id = row * columns + column + 1
+            color = province_color(province_id) if province_id <= provinces else (0, 0, 0)
+            cells.append(bytes(color) * cell_size)
+        line = b"".join(cells)
+        for i in range(cell_size):
+            yield line
+
+
+def generate_mod_tree(root, provinces, seed=0, cell_size=8):
+    """
+    Write a game and mod folder with the given number of provinces to root.
+    Returns a dictionary with the paths the editor settings need and the size of everything that was written.
+    """
+    rng = random.Random(seed)
+    game_path = os.path.join(root, "game")
+    mod_path = os.path.join(root, "mod")
+    names = get_object_names(provinces)
+    files = 0
+    size = 0
+
+    # Vanilla common files, the mod replaces the first file of each type and adds a file of its own
+    for object_type, scripts in get_common_scripts(names, rng).items():
+        for i, text in enumerate(scripts):
+            size += write_file(os.path.join(game_path, "common", object_type, f"{i:02}_{object_type}.txt"), text)
+            files += 1
+        size += write_file(os.path.join(mod_path, "common", object_type, f"00_{object_type}.txt"), scripts[0])
+        size += write_file(os.path.join(mod_path, "common", object_type, f"zz_mod_{object_type}.txt"), scripts[-1])
+        files += 2
+
+    # Province setup files
+    setup_path = os.path.join(mod_path, "setup", "provinces")
+    province_ids = range(1, provinces + 1)
+    for i in range(0, provinces, PROVINCES_PER_SETUP_FILE):
+        text = "".join(province_script(j, names, rng) for j in province_ids[i : i + PROVINCES_PER_SETUP_FILE])
+        size += write_file(os.path.join(setup_path, f"{i // PROVINCES_PER_SETUP_FILE:02}_provinces.txt"), text)
+        files += 1
+
+    # definition.csv, the first two lines are skipped by the editor like the ones in the game
+    definition_csv = os.path.join(mod_path, "map_data", "definition.csv")
+    lines = ["#Province id 0 is ignored\n", "0;0;0;0;x;x;\n"]
+    for province_id in province_ids:
+        r, g, b = province_color(province_id)
+        lines.append(f"{province_id};{r};{g};{b};Province {province_id};x;\n")
+    size += write_file(definition_csv, "".join(lines))
+    files += 1
+
+    # provinces.png
+    province_png = os.path.join(mod_path, "map_data", "provinces.png")
+    columns = math.ceil(math.sqrt(provinces))
+    width = columns * cell_size
+    height = math.ceil(provinces / columns) * cell_size
+    size += write_png(province_png, width, height, province_map_rows(provinces, columns, cell_size))
+    files += 1
+
+    return {
+        "path_to_base_game": game_path,
+        "path_to_mod": mod_path,
+        "definition_csv": definition_csv,
+        "province_png": province_png,
+        "provinces": provinces,
+        "objects": {object_type: len(object_names) for object_type, object_names in names.items()},
+        "map_size": [width, height],
+        "files": files,
+        "bytes": size,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("root", help="Directory the game and mod folders are written to")
+    parser.add_argument("--provinces", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cell-size", type=int, default=8, help="Width and height of each province in provinces.png")
+    args = parser.parse_args()
+
+    tree = generate_mod_tree(args.root, args.provinces, args.seed, args.cell_size)
+    print(f"Wrote {tree['files']} files ({tree['bytes'] / 1024 / 1024:.1f} MiB) to {args.root}")
+    print(f"game: {tree['path_to_base_game']}")
+    print(f"mod:  {tree['path_to_mod']}")
+
+
+if __name__ == "__main__":
+    main()
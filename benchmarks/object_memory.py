@@ -0,0 +1,62 @@
+"""
+Compare the memory used by PdxScriptObjects with the dict based objects they replaced.
+
+Run from the repository root:
+    python benchmarks/object_memory.py --objects 100000 --files 500
+"""
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jomini import PdxScriptObject
+
+
+class DictPdxScriptObject:
+    # The PdxScriptObject layout before __slots__ and the shared path table
+    def __init__(self, key, path, line):
+        self.key = key
+        self.path = path
+        self.line = line
+
+
+def make_objects(object_class, objects, files):
+    # Build the objects the way a GameObject loaded from a to_dict cache does, every key and path is a new string
+    data = dict()
+    for i in range(objects):
+        key = "".join(["building_", str(i)])
+        path = "".join(["C:/Games/ImperatorRome/game/common/buildings/", str(i % files), "_buildings.txt"])
+        data[key] = [path, i % 1000 + 1]
+    return [object_class(key, value[0], value[1]) for key, value in data.items()]
+
+
+def measure(object_class, objects, files):
+    gc.collect()
+    tracemalloc.start()
+    result = make_objects(object_class, objects, files)
+    gc.collect()
+    current = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return current
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--objects", type=int, default=100000)
+    parser.add_argument("--files", type=int, default=500)
+    args = parser.parse_args()
+
+    before = measure(DictPdxScriptObject, args.objects, args.files)
+    after = measure(PdxScriptObject, args.objects, args.files)
+    print(f"{args.objects} objects in {args.files} files")
+    print(f"dict objects:    {before / 1024 / 1024:8.2f} MiB ({before / args.objects:.0f} bytes per object)")
+    print(f"slotted objects: {after / 1024 / 1024:8.2f} MiB ({after / args.objects:.0f} bytes per object)")
+    print(f"saved:           {(before - after) / before:8.1%}")
+
+
+if __name__ == "__main__":
+    main()
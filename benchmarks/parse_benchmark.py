@@ -0,0 +1,176 @@
+"""
+Time every stage of loading game and mod data on synthetic mod trees and write the results as json.
+
+A tree is generated with benchmarks/mod_tree.py for every province count, then each loading stage
+the editor runs on startup is timed against it without creating any windows:
+    game_objects_cold - every GameObject type loaded with an empty cache
+    game_objects_warm - every GameObject type loaded again from the cache
+    province_setup_cold - parsing all files in setup/provinces with an empty cache
+    province_setup_warm - loading all files in setup/provinces again from the cache
+    province_table - building the columnar province table from the parsed provinces
+    definitions - loading map_data/definition.csv
+    province_map - decoding map_data/provinces.png
+
+Run from the repository root:
+    python benchmarks/parse_benchmark.py --provinces 1000 10000 100000 --output results.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from PIL import Image
+import setup_data_manager
+from setup_data_manager import (
+    settings,
+    add_game_objects_to_settings,
+    start_parse_pool,
+    shutdown_parse_pool,
+    load_province_setup,
+    load_definitions,
+    ProvinceTable,
+)
+from mod_tree import generate_mod_tree
+
+
+def time_stage(function, repeat, before=None):
+    # Run function repeat times and return the time of each run, before is called ahead of every run and is not timed
+    times = list()
+    result = None
+    for i in range(repeat):
+        if before is not None:
+            before()
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return times, result
+
+
+def summarize(times):
+    return {
+        "times": times,
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.mean(times),
+    }
+
+
+def load_game_objects():
+    return add_game_objects_to_settings().wait()
+
+
+def load_province_map():
+    with Image.open(settings.province_png) as image:
+        image.load()
+        return image.size
+
+
+def run_scale(root, provinces, repeat, seed):
+    start = time.perf_counter()
+    tree = generate_mod_tree(root, provinces, seed)
+    generate_time = time.perf_counter() - start
+
+    # Point the editor at the generated tree, GameObjects read these settings when they are created
+    settings.path_to_base_game = tree["path_to_base_game"]
+    settings.path_to_mod = tree["path_to_mod"]
+    settings.definition_csv = tree["definition_csv"]
+    settings.province_png = tree["province_png"]
+    cache_path = os.path.join(root, "cache")
+    setup_data_manager.CACHE_PATH = cache_path
+
+    def clear_cache():
+        shutil.rmtree(cache_path, ignore_errors=True)
+
+    stages = dict()
+    times, game_objects = time_stage(load_game_objects, repeat, clear_cache)
+    stages["game_objects_cold"] = summarize(times)
+    times, game_objects = time_stage(load_game_objects, repeat)
+    stages["game_objects_warm"] = summarize(times)
+
+    def load_setup():
+        return load_province_setup(Path(settings.path_to_mod + "/setup/provinces"))
+
+    times, (all_province_data, id_to_file_dict) = time_stage(load_setup, repeat, clear_cache)
+    stages["province_setup_cold"] = summarize(times)
+    times, (all_province_data, id_to_file_dict) = time_stage(load_setup, repeat)
+    stages["province_setup_warm"] = summarize(times)
+    times, province_table = time_stage(lambda: ProvinceTable(all_province_data, id_to_file_dict), repeat)
+    stages["province_table"] = summarize(times)
+    times, (province_list, rgb_list) = time_stage(load_definitions, repeat)
+    stages["definitions"] = summarize(times)
+    times, map_size = time_stage(load_province_map, repeat)
+    stages["province_map"] = summarize(times)
+
+    # Counts let a regression in what is parsed be told apart from a regression in speed
+    return {
+        "provinces": provinces,
+        "files": tree["files"],
+        "bytes": tree["bytes"],
+        "map_size": list(map_size),
+        "generate_time": generate_time,
+        "loaded": {
+            "game_objects": {name: game_object.length() for name, game_object in game_objects.items()},
+            "provinces": len(all_province_data),
+            "definitions": len(province_list),
+        },
+        "stages": stages,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--provinces", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=3, help="Number of times each stage is timed")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--executor", choices=["serial", "thread", "process"], help="Defaults to the parse_executor setting")
+    parser.add_argument("--output", default="-", help="File the json results are written to, - for stdout")
+    parser.add_argument("--tree-dir", help="Directory the trees are generated in and kept, a temporary directory by default")
+    args = parser.parse_args()
+
+    if args.executor:
+        settings.parse_executor = args.executor
+
+    results = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "executor": settings.parse_executor,
+        "repeat": args.repeat,
+        "seed": args.seed,
+        "scales": list(),
+    }
+    base_dir = args.tree_dir or tempfile.mkdtemp(prefix="mod_tree_")
+    # Every stage shares one pool like the editor does on startup, so starting it isn't timed
+    start_parse_pool()
+    try:
+        for provinces in args.provinces:
+            root = os.path.join(base_dir, str(provinces))
+            shutil.rmtree(root, ignore_errors=True)
+            scale = run_scale(root, provinces, args.repeat, args.seed)
+            results["scales"].append(scale)
+            stages = "  ".join(f"{name} {stage['median']:.3f}s" for name, stage in scale["stages"].items())
+            print(f"{provinces} provinces: {stages}", file=sys.stderr)
+    finally:
+        shutdown_parse_pool()
+        if not args.tree_dir:
+            shutil.rmtree(base_dir, ignore_errors=True)
+
+    output = json.dumps(results, indent=4)
+    if args.output == "-":
+        print(output)
+    else:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
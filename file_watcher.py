@@ -0,0 +1,208 @@
+import os
+import sys
+import ctypes
+import ctypes.util
+import select
+import struct
+import threading
+
+"""
+    Watch directories of game files and report which files changed.
+
+    inotify is used on Linux so changes are reported as soon as a file is written,
+    every other platform (or a Linux system where inotify can't be used) falls back to polling the modified time and size of files.
+
+    watcher = FileWatcher(["mod/common/cultures"], callback)
+    watcher.start()
+    ...
+    watcher.stop()
+
+    callback is called from the watcher thread with a set of the paths that changed, were created or were deleted.
+    Events are collected until nothing has changed for debounce seconds so saving a file only causes one callback.
+"""
+
+# inotify constants from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class FileWatcher:
+    def __init__(self, directories, callback, interval=1.0, debounce=0.3, use_inotify=True):
+        self.directories = [i for i in directories if os.path.isdir(i)]
+        self.callback = callback
+        self.interval = interval  # Seconds between scans when polling
+        self.debounce = debounce
+        self.use_inotify = use_inotify
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.mode = ""
+
+    def start(self) -> None:
+        """Start watching in a daemon thread so the watcher never keeps the application open"""
+        if self.thread is not None:
+            return
+        inotify = InotifyWatch.create(self.directories) if self.use_inotify else None
+        if inotify is not None:
+            self.mode = "inotify"
+            target = lambda: self.watch_inotify(inotify)
+        else:
+            self.mode = "polling"
+            target = self.watch_polling
+        self.thread = threading.Thread(target=target, name="FileWatcher", daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.stop_event.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join()
+        self.thread = None
+
+    def notify(self, changed: set) -> None:
+        if not changed:
+            return
+        try:
+            self.callback(changed)
+        except Exception as e:
+            # The watcher thread has to keep running even if a file couldn't be parsed
+            print(e, file=sys.stderr)
+
+    def watch_inotify(self, inotify) -> None:
+        changed = set()
+        try:
+            while not self.stop_event.is_set():
+                # Wait for the first event without a timeout cost, then keep collecting until the files settle
+                events = inotify.read(self.debounce if changed else 0.5)
+                if events is None:
+                    # The event queue overflowed so it isn't known what changed, report every file
+                    changed |= set(scan_files(self.directories))
+                    continue
+                if events:
+                    changed |= events
+                elif changed:
+                    self.notify(changed)
+                    changed = set()
+        finally:
+            inotify.close()
+
+    def watch_polling(self) -> None:
+        snapshot = scan_files(self.directories)
+        while not self.stop_event.wait(self.interval):
+            current = scan_files(self.directories)
+            changed = {i for i in current.keys() | snapshot.keys() if current.get(i) != snapshot.get(i)}
+            snapshot = current
+            self.notify(changed)
+
+
+def scan_files(directories) -> dict:
+    """Return a dictionary of every file in directories and their subdirectories with their (modified time, size)"""
+    files = dict()
+    to_scan = list(directories)
+    while to_scan:
+        directory = to_scan.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        to_scan.append(entry.path)
+                    else:
+                        stat = entry.stat()
+                        files[entry.path] = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            continue
+    return files
+
+
+class InotifyWatch:
+    """Recursive inotify watch of several directories, created with create() which returns None when inotify isn't available"""
+
+    def __init__(self, libc, fd):
+        self.libc = libc
+        self.fd = fd
+        self.watches = dict()  # Watch descriptor -> directory
+
+    @classmethod
+    def create(cls, directories):
+        if not sys.platform.startswith("linux"):
+            return None
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        except (OSError, AttributeError):
+            return None
+        if fd < 0:
+            return None
+        watch = cls(libc, fd)
+        for directory in directories:
+            if not watch.add_tree(directory):
+                # Usually the max_user_watches limit was hit, polling still works
+                watch.close()
+                return None
+        return watch
+
+    def add_tree(self, directory: str) -> bool:
+        """Watch a directory and all of its subdirectories"""
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            return False
+        self.watches[wd] = directory
+        try:
+            with os.scandir(directory) as entries:
+                subdirectories = [i.path for i in entries if i.is_dir()]
+        except OSError:
+            return True
+        return all(self.add_tree(i) for i in subdirectories)
+
+    def read(self, timeout: float):
+        """
+        Return a set of the paths that changed within timeout seconds
+        Returns None if the kernel dropped events because too many happened at once
+        """
+        changed = set()
+        readable = select.select([self.fd], [], [], timeout)[0]
+        if not readable:
+            return changed
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+        offset = 0
+        while offset < len(data):
+            wd, mask, cookie, length = EVENT_HEADER.unpack_from(data, offset)
+            name = os.fsdecode(data[offset + EVENT_HEADER.size : offset + EVENT_HEADER.size + length].rstrip(b"\0"))
+            offset += EVENT_HEADER.size + length
+            if mask & IN_Q_OVERFLOW:
+                return None
+            directory = self.watches.get(wd)
+            if directory is None:
+                continue
+            if mask & IN_IGNORED:
+                del self.watches[wd]
+                continue
+            if not name:
+                continue
+            path = os.path.join(directory, name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    # Files can already be in a directory that was moved in
+                    self.add_tree(path)
+                    changed |= set(scan_files([path]))
+                else:
+                    # Files in a deleted directory don't get their own events
+                    changed.add(path)
+                continue
+            changed.add(path)
+        return changed
+
+    def close(self) -> None:
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
@@ -1,9 +1,23 @@
 import os
+import re
+import sys
+import mmap
+import time
+import json
+import struct
+import hashlib
+import bisect
 from json import dumps
+from array import array
+from threading import Lock
+from typing import Any, NamedTuple, Optional
+from contextlib import contextmanager
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, ProcessPoolExecutor
 
 """
 	All of this code is not game specific, any Jomini based paradox game can use this to parse game files and create GameObjects.
 	Conflicts between the base game with mods and conflicts between mods and other mods are automatically resolved when GameObjects are created
+	A mod file with the same path as a vanilla file (or a file of a mod earlier in the load order) replaces that file completely and the replaced file is never read
 
 	A GameObject is something in the game folder that is associated with...the game
 	for example: buildings, cultures, trade goods, traits, states, regions, etc...
@@ -20,20 +34,34 @@ from json import dumps
 	buildings.print()
 
 	Note that creating game objects is IO bound so using threading to create several objects will greatly increase the speed
+	GameObjectLoader does this, every GameObject type is created as its own task on a bounded thread pool:
+		loader = GameObjectLoader({"buildings": V3Building, "cultures": V3Culture}, progress=callback)
+		loader.start()
+		buildings = loader.result("buildings")  # Only waits for buildings
+		game_objects = loader.wait()  # Waits for everything
+	Files of a single GameObject can also be parsed in parallel with the executor option, a process pool is not limited by the GIL
+	When several GameObjects are loaded at once they should share one pool from create_executor("process") instead of each starting their own
 
-	GameObjects (V3Building for example) are basically PdxScriptObjectTypes, and PdxScriptObjectTypes are basically a list of PdxScriptObjects
+	GameObjects (V3Building for example) are basically PdxScriptObjectTypes, and PdxScriptObjectTypes are basically an ordered dictionary of PdxScriptObjects indexed by key
 	PdxScriptObjects are everything that needs to be known about a game object
 
 	Several init options are available when making a new GameObject:
-		1. level - integer that determines the level files should be parsed at, level=0 is no tabs in, level=1 is 1 tab in, etc...
+		1. level - integer that determines the level files should be parsed at, level=0 is top level keys, level=1 is keys inside of one block, etc...
 		2. ignored_files - list of filenames that should not be parsed
 		3. included_files - list of filenames that should be parsed, if this is defined only files in this list will be parsed
+		4. cache_path - directory where parsed files are cached between runs, if this is empty nothing is cached
+		5. cache_hash - also compare file contents with a hash when the modified time of a file changes, so touching a file doesn't cause it to be parsed again
+		6. executor - how files are parsed, "serial", "thread", "process" or an existing concurrent.futures Executor that is shared between GameObjects
+		7. max_workers - maximum number of threads or processes used when the executor is "thread" or "process", defaults to the number of cores
+		8. scan_mode - "mmap" scans memory mapped files as bytes and only decodes the keys that are found, "text" reads each file into a string first
+		9. profile - record how long every file took to read and parse in a ParseProfile, available as game_object.profile after loading
 
 	When inheriting from GameObjectBase the following methods are available:
 		• length() - Return the length of the list of PdxScriptObjects -> int
 		• print() - Print a breakdown of all the PdxScriptObjects, showing the key, path and line number -> None
 		• contains(key) - Check if a PdxScriptObjectType contains a specific string or PdxScriptObject -> bool
 		• keys() - Return a list of keys of all the PdxScriptObjects -> list[str]
+		• search_keys(text, limit, substring, fuzzy) - Return keys that start with text, then keys that contain text or fuzzy match it -> list[str]
 		• access(key) - Return a PdxScriptObject given a string or a PdxScriptObject, returns False if not found -> PdxScriptObject
 		• sort() - Sort the list of PdxScriptObjects by their key -> None
 		• remove() - Remove a PdxScriptObject or string -> None
@@ -41,10 +69,41 @@ from json import dumps
 		• add() - Add a new PdxScriptObject to the object -> None
 		• to_dict() - Return a dictionary of PdxScriptObjects -> dict
 		• to_json() - Return a json formatted string of PdxScriptObjects -> str
+		• reload(changed_files) - Parse changed files again and rebuild the objects without reading any other file, True if the keys changed -> bool
+
+	When a cache_path is set every parsed file is stored in "cache_path/ClassName.cache" along with its modified time and size.
+	The next time the GameObject is created only files that have changed since the cache was written are parsed again.
+	Caches are binary snapshots with a single table of the paths and keys in them, they are memory mapped when read.
+
+	GameObjects can be saved to and loaded from a snapshot as well, which is much smaller and faster to load than to_json:
+		write_game_objects_snapshot("game_objects.snapshot", {"buildings": buildings, "cultures": cultures})
+		game_objects = read_game_objects_snapshot("game_objects.snapshot") -> {"buildings": GameObjectBase, ...}
+
+	When profile is True every file that is loaded is recorded with its size, line count, number of objects, read time and parse time,
+	along with the number of files and keys each directory overrides:
+		buildings.profile.summary(10) -> str of the 10 slowest files
+		buildings.profile.to_json() -> str with every file and directory
+	When profile is False nothing is timed or counted.
+
+	When the executor is "process" the GameObject is pickled and sent to the worker processes with parse_file,
+	so GameObject classes have to be defined at the top level of a module and scripts need a if __name__ == "__main__": guard.
+
+	Only the key, path and line of objects are found when a GameObject is created.
+	The value of an object is parsed when it is first accessed with PdxScriptObject.value, which returns a ScriptBlock:
+		building = buildings.access("port_building")
+		building.value["cost"] -> "10"
+		building.value.get_all("modifier") -> [ScriptBlock, ...]
+		building.value.to_python() -> {"cost": "10", ...}
+	parse_script(text) can be used to parse any script text the same way.
+
+	ReferenceIndex finds where keys are used in the game and mods, in any script file and not only in the files of a GameObject:
+		index = ReferenceIndex([vanilla_path, mod_path], directories=("common", "events", "setup"), cache_path="cache")
+		index.update(buildings.keys() + cultures.keys())
+		index.get("roman") -> [(path, line), ...]
 
 	To implement custom parsing for a GameObject:
 		1. override the get_pdx_object_list() function
-		2. Fill self.main with data in another way, all that should have to be changed is the should_read(line) part
+		2. Fill self.main with data in another way, usually all that has to be changed is parse_file(file_path) or the scan_keys() call in it
 		3. If more information than key, path, and line number are needed:
 		4. implement a new PdxScriptObject class that has more attributes but keeps the same methods as PdxScriptObject
 		5. Make sure self.main is filled with the new attributes when parsing
@@ -52,6 +111,36 @@ from json import dumps
 """
 
 
+class PathTable:
+	"""
+		Table of every file path objects have been found in, shared by all PdxScriptObjects
+		Objects only store the small integer id of their path, so thousands of objects from the same file don't each hold a copy of the path
+	"""
+
+	def __init__(self):
+		self.paths = list()
+		self.ids = dict()
+		self.lock = Lock()
+
+	def get_id(self, path: str) -> int:
+		""" Return the id of a path, adding it to the table if it isn't in it yet """
+		path_id = self.ids.get(path)
+		if path_id is None:
+			with self.lock:
+				path_id = self.ids.get(path)
+				if path_id is None:
+					path_id = len(self.paths)
+					self.paths.append(path)
+					self.ids[path] = path_id
+		return path_id
+
+	def get_path(self, path_id: int) -> str:
+		return self.paths[path_id]
+
+
+path_table = PathTable()
+
+
 class PdxScriptObject:
 	"""
 		Class to hold everything that needs to be known about a GameObject
@@ -59,13 +148,40 @@ class PdxScriptObject:
 		1. The objects key
 		2. The path to the file the key is found in
 		3. The line number the key is found at
+
+		Objects use __slots__, keys are interned and paths are stored as an id in the shared path_table to keep the memory use of large GameObjects low
 	"""
 
+	__slots__ = ("key", "path_id", "line")
+
 	def __init__(self, key, path, line):
-		self.key = key
-		self.path = path
+		self.key = sys.intern(key)
+		self.path_id = path_table.get_id(path)
 		self.line = line
 
+	@property
+	def path(self) -> str:
+		return path_table.paths[self.path_id]
+
+	@path.setter
+	def path(self, path: str) -> None:
+		self.path_id = path_table.get_id(path)
+
+	def __reduce__(self):
+		# Path ids are only valid in this process so objects are pickled with their path
+		return (type(self), (self.key, self.path, self.line))
+
+	@property
+	def value(self):
+		"""
+			Return the value of the object as a ScriptBlock (or a string for a plain value), None if it can't be found
+			The file is only parsed the first time a value from it is needed
+		"""
+		if not self.path:
+			return None
+		entry = get_script_file(self.path).find(self.key, self.line)
+		return None if entry is None else entry.value
+
 	# Override operators so they compare using self.key only
 	# Can be used to compare PdxScriptObjects or to compare self.key to another string
 	def __eq__(self, other):
@@ -76,6 +192,9 @@ class PdxScriptObject:
 		else:
 			return False
 
+	def __hash__(self):
+		return hash(self.key)
+
 	def __lt__(self, other):
 		if isinstance(other, PdxScriptObject):
 			return (self.key < other.key)
@@ -95,27 +214,148 @@ class PdxScriptObject:
 
 class PdxScriptObjectType:
 	"""
-		Class to hold a list of PdxScriptObject types (or similar types)
+		Class to hold a collection of PdxScriptObject types (or similar types)
+		Objects are indexed by their key so merging, overriding and lookups are constant time
+		Insertion order is preserved so iterating yields objects in the order they were first defined
 	"""
 
 	def __init__(self, obj_list):
-		self.objects = obj_list
+		self.objects = dict()
+		for i in obj_list:
+			self.add(i)
 
 	def __iadd__(self, other):
 		"""
 			Override += operator so 2 PdxScriptObjectTypes can be added together
 			If a key is already defined the key get overriden by the new key
 		"""
-		for j in other.objects:
-			if j in self.objects:
-				# Replace the object in self.objects with the object in other.objects
-				self.objects[self.objects.index(j)].path = j.path
-				self.objects[self.objects.index(j)].line = j.line
-			else:
-				# Append a new object if there are no conflicts
-				self.objects.append(j)
+		for j in other:
+			self.add(j)
 		return self
 
+	def __iter__(self):
+		return iter(self.objects.values())
+
+	def __len__(self):
+		return len(self.objects)
+
+	def __contains__(self, key):
+		return self.get(key) is not None
+
+	def add(self, obj) -> None:
+		"""
+			Add a PdxScriptObject, if the key is already defined the existing object gets the path and line of the new one
+		"""
+		existing = self.objects.get(obj.key)
+		if existing is None:
+			# Append a new object if there are no conflicts
+			self.objects[obj.key] = obj
+		else:
+			# Replace the location of the existing object so it keeps its position
+			existing.path = obj.path
+			existing.line = obj.line
+
+	def get(self, key):
+		""" Return the object for a string or PdxScriptObject key, None if it is not found """
+		if isinstance(key, PdxScriptObject):
+			key = key.key
+		elif not isinstance(key, str):
+			return None
+		return self.objects.get(key)
+
+	def remove(self, key) -> None:
+		""" Remove the object for a string or PdxScriptObject key if it exists """
+		obj = self.get(key)
+		if obj is not None:
+			del self.objects[obj.key]
+
+	def clear(self) -> None:
+		self.objects.clear()
+
+	def sort(self) -> None:
+		self.objects = {i.key: i for i in sorted(self.objects.values())}
+
+
+class KeyIndex:
+	"""
+		Sorted index of keys for completion, matching ignores case
+		Prefix searches are a binary search of the sorted keys so they take the same time no matter how many keys there are.
+		Substring and fuzzy searches run over all keys joined into one string so the scanning is done by str.find and the regex engine
+		instead of a python loop, and they stop as soon as limit keys are found
+	"""
+
+	def __init__(self, keys):
+		pairs = sorted((i.lower(), i) for i in keys)
+		self.folded = [i[0] for i in pairs]
+		self.keys = [i[1] for i in pairs]
+		self.text = "\n".join(self.folded)
+		# Position of each key in text
+		self.starts = list()
+		position = 0
+		for i in self.folded:
+			self.starts.append(position)
+			position += len(i) + 1
+
+	def __len__(self):
+		return len(self.keys)
+
+	def key_at(self, position: int) -> int:
+		""" Return the index of the key a position in text is in """
+		return bisect.bisect_right(self.starts, position) - 1
+
+	def prefix(self, text: str, limit=None) -> list:
+		""" Return the keys that start with text in sorted order """
+		text = text.lower()
+		start = bisect.bisect_left(self.folded, text)
+		end = bisect.bisect_left(self.folded, text + "\uffff", start) if limit is None else min(start + limit, len(self.keys))
+		return [self.keys[i] for i in range(start, end) if self.folded[i].startswith(text)]
+
+	def substring(self, text: str, limit=None) -> list:
+		""" Return the keys that contain text but don't start with it, in sorted order """
+		text = text.lower()
+		found = list()
+		last = -1
+		position = self.text.find(text)
+		while position != -1 and (limit is None or len(found) < limit):
+			index = self.key_at(position)
+			if index != last and self.starts[index] != position:
+				found.append(self.keys[index])
+				last = index
+			# Continue after the key that matched, a key is only returned once
+			position = self.text.find(text, self.starts[index] + len(self.folded[index]) + 1)
+		return found
+
+	def fuzzy(self, text: str, limit=None) -> list:
+		""" Return the keys that have every character of text in the same order but don't contain text, in sorted order """
+		text = text.lower()
+		# Not anchoring the pattern to the start of each key lets the regex engine skip ahead to the first character,
+		# and each gap can't contain the character after it so the pattern never backtracks
+		pattern = re.escape(text[0]) + "".join(r"[^\n" + re.escape(i) + "]*" + re.escape(i) for i in text[1:])
+		found = list()
+		last = -1
+		for match in re.finditer(pattern, self.text):
+			index = self.key_at(match.start())
+			if index != last and text not in self.folded[index]:
+				found.append(self.keys[index])
+				if limit is not None and len(found) >= limit:
+					break
+			last = index
+		return found
+
+	def search(self, text: str, limit=50, substring=True, fuzzy=False) -> list:
+		"""
+			Return up to limit keys that match text, prefix matches come first, then keys that contain text and then fuzzy matches
+			An empty text returns the first keys
+		"""
+		if not text:
+			return self.keys[:limit]
+		found = self.prefix(text, limit)
+		if substring and (limit is None or len(found) < limit):
+			found += self.substring(text, None if limit is None else limit - len(found))
+		if fuzzy and (limit is None or len(found) < limit):
+			found += self.fuzzy(text, None if limit is None else limit - len(found))
+		return found
+
 
 class GameObjectBase:
 	"""
@@ -124,15 +364,28 @@ class GameObjectBase:
 		vanilla_path is the path to the vanilla game folder.
 	"""
 
-	def __init__(self, paths=[], vanilla_path="", level=0, ignored_files=[], included_files=[]):
+	def __init__(self, paths=[], vanilla_path="", level=0, ignored_files=[], included_files=[], cache_path="", cache_hash=False, executor="serial", max_workers=None, scan_mode="mmap", profile=False):
 		self.paths = paths
 		self.vanilla_path = vanilla_path
 		self.main = PdxScriptObjectType([PdxScriptObject(" ", "", 0)])
 		self.level = level  # How many tabs in should the file be parsed?
 		self.ignored_files = ignored_files
 		self.included_files = included_files
-		self.start = 0
-		self.end = 0
+		self.cache_path = cache_path
+		self.cache_hash = cache_hash
+		self.cache = None
+		self.executor = executor
+		self.max_workers = max_workers
+		self.pool = None
+		self.scan_mode = scan_mode
+		self.profile = ParseProfile(type(self).__name__) if profile else None
+		# KeyIndex of the keys, made the first time keys are searched and thrown away whenever the keys change
+		self.key_index = None
+		# Directories objects were loaded from in load order, and the (key, line) tuples found in each file, used to reload changed files
+		self.object_dirs = list()
+		self.files = dict()
+		# Files that are replaced by a file with the same path in a mod later in the load order
+		self.shadowed_files = set()
 		# Keys that should not be added to objects when parsing
 		self.exclusion_keys = {
 			"#", "@", "modifier", "character_modifier", "if", "else", "elseif", "else_if", "\n", "can_have",
@@ -147,63 +400,73 @@ class GameObjectBase:
 
 	def print(self) -> None:
 		""" Print a breakdown of all the PdxScriptObjects in the PdxScriptObjectType """
-		for i in self.main.objects:
+		for i in self.main:
 			print(f"Key: {i.key} -- File: {i.path} -- Line: {i.line}")
 
 	def add(self, obj) -> None:
 		"""
 			Add a new PdxScriptObject to the object list
-			Make a new PdxScriptObjectType so potential conflicts with the new object are resolved when inserted
+			Potential conflicts with the new object are resolved when inserted
 		"""
-		self.main += PdxScriptObjectType([obj])
+		self.main.add(obj)
+		self.key_index = None
 
 	def remove(self, key) -> None:
 		""" Remove the specified PdxScriptObject or string"""
-		if key in self.main.objects:
-			self.main.objects.remove(key)
+		self.main.remove(key)
+		self.key_index = None
 
 	def clear(self) -> None:
 		""" Clear all objects from the list """
-		for key in self.keys():
-			self.main.objects.remove(key)
+		self.main.clear()
+		self.key_index = None
 
 	def sort(self) -> None:
 		"""
 			Sort PdxScriptObjects by key
 		"""
-		self.main.objects = sorted(self.main.objects)
+		self.main.sort()
 
 	def length(self) -> int:
 		""" Return the length of the object list """
-		return len(self.main.objects)
+		return len(self.main)
 
 	def contains(self, key) -> bool:
 		""" Check if the PdxScriptObjectType contains a specified PdxScriptObject or a string"""
-		return True if key in self.main.objects else False
+		return key in self.main
 
 	def keys(self) -> list:
 		""" Return a list of the keys in the object"""
-		keys = []
-		for i in self.main.objects:
-			keys.append(i.key)
-		return keys
+		return list(self.main.objects)
+
+	def get_key_index(self) -> KeyIndex:
+		""" Return a KeyIndex of the keys in the object, it is only made again after the keys changed """
+		key_index = self.key_index
+		if key_index is None:
+			key_index = self.key_index = KeyIndex(self.main.objects)
+		return key_index
+
+	def search_keys(self, text: str, limit=50, substring=True, fuzzy=False) -> list:
+		"""
+			Return up to limit keys that start with text, followed by keys that contain text if substring is True
+			and keys that have the characters of text in order if fuzzy is True
+		"""
+		return self.get_key_index().search(text, limit, substring, fuzzy)
 
 	def access(self, key):
 		"""
 			Return the PdxScriptObject (or similar type) with the specified key
 			return false if the key is not found
 		"""
-		if self.contains(key):
-			return self.main.objects[self.main.objects.index(key)]
-		else:
-			return False
+		obj = self.main.get(key)
+		return False if obj is None else obj
 
 	def to_dict(self) -> dict:
 		"""
 			Return a dictionary with the keys being the keys of the PdxScriptObject and the value being a list of the file and line
 		"""
 		d = dict()
-		for i in self.main.objects:
+		for i in self.main:
 			d[i.key] = [i.path, i.line]
 		return d
 
@@ -213,19 +476,22 @@ class GameObjectBase:
 		"""
 		return dumps(self.to_dict())
 
-	# Iterator methods so objects can be used in for loops
-	def __iter__(self):
-		return self
+	def __getstate__(self):
+		# Only the parsing options are needed when a GameObject is sent to a worker process
+		state = self.__dict__.copy()
+		state["main"] = PdxScriptObjectType([])
+		state["cache"] = None
+		state["pool"] = None
+		state["files"] = dict()
+		state["profile"] = None
+		state["key_index"] = None
+		if isinstance(self.executor, Executor):
+			state["executor"] = "serial"
+		return state
 
-	def __next__(self):
-		if self.start > self.end:
-			# Reset and stop iteration so it can be looped over again like a normal list
-			self.start = 0
-			self.end = self.length() - 1
-			raise StopIteration
-		current = self.main.objects[self.start]
-		self.start += 1
-		return current
+	# Iterator method so objects can be used in for loops, a new iterator is made each time so it can be looped over again like a normal list
+	def __iter__(self):
+		return iter(self.main)
 
 	# Class Functions needed to initialize data, don't need to be use anything below this after initilization of class
 	def get_data(self, objpath: str) -> None:
@@ -235,40 +501,42 @@ class GameObjectBase:
 		objpath_parts = objpath.split('\\')
 		# Create a platform-independent path using os.path.join()
 		objpath = os.path.join(*objpath_parts)
-		
-		for dirpath, dirnames, filenames in os.walk(self.vanilla_path):
-			if objpath in dirpath:
-				self.main += self.get_pdx_object_list(dirpath)
-		self.remove(" ")
-		# Fill collections with mod data
-		for path in self.paths:
-			for dirpath, dirnames, filenames in os.walk(path):
-				if objpath in dirpath:
-					self.main += self.get_pdx_object_list(dirpath)
 
-		# Remove vanilla objects when mod file overrides vanilla file but the mod file doens't include that object
+		if self.cache_path:
+			self.cache = GameObjectCache(
+				os.path.join(self.cache_path, f"{type(self).__name__}.cache"),
+				self.get_cache_signature(objpath),
+				self.cache_hash
+			)
 
-		#
-		# TODO this does not work and I can't figure out how to make it work right now but it's pretty important so need to figure it out
-		#
+		# Only the objpath directory in each root is walked, the rest of the game folder is never touched
+		for root in [self.vanilla_path] + self.paths:
+			object_dir = self.get_object_dir(root, objpath)
+			if object_dir:
+				self.object_dirs.append(object_dir)
 
-		vanilla_files = set()
-		mod_files = set()
+		# Files replaced by a mod are found before anything is parsed so they are never read
+		self.resolve_overrides()
 
-		for i in self.main.objects:
-			if self.vanilla_path in i.path:
-				vanilla_files.add(i.path.rpartition("\\")[2])
-			else:
-				mod_files.add(i.path.rpartition("\\")[2])
-
-		conflicting_files = (x for x in vanilla_files if x in mod_files)
-		if sum(1 for _ in conflicting_files) > 0:
-			to_remove = (x for x in self.main.objects if x.key == "" or (self.vanilla_path in i.path and i.path.rpartition("\\")[2] in conflicting_files))
-			for i in to_remove:
-				self.main.objects.remove(i)
+		if self.profile is None:
+			for object_dir in self.object_dirs:
+				self.main += self.get_pdx_object_list(object_dir)
+		else:
+			self.profile.start()
+			for object_dir in self.object_dirs:
+				start = time.perf_counter()
+				obj_list = self.get_pdx_object_list(object_dir)
+				load_time = time.perf_counter() - start
+				overridden_keys = sum(1 for i in obj_list if i.key in self.main.objects)
+				self.main += obj_list
+				self.profile.add_directory(object_dir, load_time, len(obj_list), overridden_keys, self.shadowed_files)
+			self.profile.stop()
+		self.remove(" ")
+		self.key_index = None
 
-		# Set Iterator position
-		self.end = self.length() - 1
+		if self.cache is not None:
+			self.cache.save()
+		self.shutdown_pool()
 
 	# Override this function for custom parsing of GameObjects
 	def get_pdx_object_list(self, path: str) -> PdxScriptObjectType:
@@ -277,35 +545,1308 @@ class GameObjectBase:
 			path = path to directory with GameObjects in it
 		"""
 		obj_list = list()
-		for dirpath, dirnames, filenames in os.walk(path):
-			for filename in [f for f in filenames if f.endswith(".txt")]:
-				if filename in self.ignored_files:
+		files = self.get_script_files(path)
+		for file_path, objects in zip(files, self.get_files_objects(files)):
+			self.files[file_path] = objects
+			for key, line in objects:
+				obj_list.append(PdxScriptObject(key, file_path, line))
+		return PdxScriptObjectType(obj_list)
+
+	def reload(self, changed_files=()) -> bool:
+		"""
+			Parse the files in changed_files again and rebuild the objects without reading any other file
+			Files that were added to or deleted from the object directories are found automatically
+			Return True if the keys of the GameObject changed
+		"""
+		changed_files = set(changed_files)
+		self.resolve_overrides()
+		files = list()
+		for directory in self.object_dirs:
+			if os.path.isdir(directory):
+				files += self.get_script_files(directory)
+
+		to_parse = [i for i in files if i in changed_files or i not in self.files]
+		parsed = dict(zip(to_parse, self.map_files(self.parse_file, to_parse)))
+		self.shutdown_pool()
+
+		main = PdxScriptObjectType([])
+		new_files = dict()
+		for file_path in files:
+			objects = parsed[file_path] if file_path in parsed else self.files[file_path]
+			new_files[file_path] = objects
+			for key, line in objects:
+				main.add(PdxScriptObject(key, file_path, line))
+
+		if self.cache is not None:
+			for file_path in parsed:
+				self.cache.set(file_path, parsed[file_path])
+			for file_path in self.files.keys() - new_files.keys():
+				self.cache.discard(file_path)
+			self.cache.save()
+
+		old_keys = self.keys()
+		# Replace everything at once so other threads never see a half built GameObject
+		self.files = new_files
+		self.main = main
+		self.key_index = None
+		return self.keys() != old_keys
+
+	def resolve_overrides(self) -> None:
+		"""
+			Find the files that are replaced by a file with the same path relative to the object directory in a later directory
+			The vanilla game is first in the load order followed by mods in the order of the paths list, so a mod always replaces vanilla files
+			Objects that are only in a replaced file are removed from the game, just like they are when the game loads the mod
+		"""
+		self.shadowed_files = resolve_script_files(self.object_dirs, self.ignored_files, self.included_files)[1]
+
+	@staticmethod
+	def get_object_dir(root: str, objpath: str) -> str:
+		"""
+			Return the objpath directory inside of a game or mod folder, or an empty string if it doesn't exist
+			The path is joined directly so similar directories like common/buildings_extra are never matched
+		"""
+		if not root:
+			return ""
+		path = os.path.join(root, objpath)
+		return path if os.path.isdir(path) else ""
+
+	def get_script_files(self, path: str) -> list:
+		"""
+			Return the paths of all script files in a directory and its subdirectories
+			Files are sorted by name in each directory so the load order is the same on every platform
+			Files replaced by a mod are left out
+		"""
+		files = walk_script_files(path, self.ignored_files, self.included_files)
+		return [i for i in files if i not in self.shadowed_files]
+
+	def get_file_objects(self, file_path: str) -> list:
+		"""
+			Return a list of (key, line) tuples for a file
+			The cache is used when the file hasn't changed since it was last parsed
+		"""
+		return self.get_files_objects([file_path])[0]
+
+	def get_files_objects(self, files: list) -> list:
+		"""
+			Return a list of (key, line) tuple lists, one for each file in files and in the same order
+			Files that aren't in the cache are parsed independently with the executor
+		"""
+		results = [None] * len(files)
+		to_parse = list()
+		for i, file_path in enumerate(files):
+			if self.cache is not None:
+				results[i] = self.cache.get(file_path)
+			if results[i] is None:
+				to_parse.append(i)
+			elif self.profile is not None:
+				self.profile.add_file(FileStats(file_path, os.path.getsize(file_path), None, len(results[i]), 0.0, 0.0, True))
+
+		if self.profile is None:
+			parsed = self.map_files(self.parse_file, [files[i] for i in to_parse])
+		else:
+			parsed = list()
+			for objects, stats in self.map_files(self.profile_file, [files[i] for i in to_parse]):
+				parsed.append(objects)
+				self.profile.add_file(stats)
+		for i, objects in zip(to_parse, parsed):
+			results[i] = objects
+			if self.cache is not None:
+				self.cache.set(files[i], objects)
+		return results
+
+	def map_files(self, function, files: list) -> list:
+		""" Call function on every file with the executor and return the results in the same order as files """
+		if self.executor == "serial" or len(files) < 2:
+			return [function(i) for i in files]
+		return map_executor(self.get_pool(), function, files, self.max_workers)
+
+	def get_pool(self) -> Executor:
+		""" Return the executor files are parsed with, pools are only started the first time there are files to parse """
+		if isinstance(self.executor, Executor):
+			return self.executor
+		if self.pool is None:
+			self.pool = create_executor(self.executor, self.max_workers)
+		return self.pool
+
+	def shutdown_pool(self) -> None:
+		""" Shut down the pool started by get_pool, executors that were passed in are left running """
+		if self.pool is not None:
+			self.pool.shutdown()
+			self.pool = None
+
+	def parse_file(self, file_path: str) -> list:
+		""" Parse a single file and return a list of (key, line) tuples """
+		if self.scan_mode == "mmap":
+			return scan_file_keys(file_path, self.level, self.exclusion_keys)
+		with open(file_path, "r", encoding='utf-8-sig') as file:
+			text = file.read()
+		return scan_keys(text, self.level, self.exclusion_keys)
+
+	def profile_file(self, file_path: str) -> tuple:
+		"""
+			Parse a single file like parse_file and return a tuple of its (key, line) tuples and a FileStats
+			In mmap mode the lines are counted before scanning, which reads every page of the file, so the read time includes the disk
+		"""
+		start = time.perf_counter()
+		if self.scan_mode == "mmap":
+			with open(file_path, "rb") as file:
+				size = os.fstat(file.fileno()).st_size
+				if size == 0:
+					return list(), FileStats(file_path, 0, 0, 0, time.perf_counter() - start, 0.0, False)
+				with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+					# mmap has no count(), lines are counted in chunks so the file is never copied whole
+					lines = sum(buffer[i:i + 1048576].count(b"\n") for i in range(0, size, 1048576)) + 1
+					read = time.perf_counter()
+					objects = scan_keys(buffer, self.level, self.exclusion_keys)
+		else:
+			with open(file_path, "r", encoding='utf-8-sig') as file:
+				text = file.read()
+			size = os.path.getsize(file_path)
+			lines = text.count("\n") + 1
+			read = time.perf_counter()
+			objects = scan_keys(text, self.level, self.exclusion_keys)
+		return objects, FileStats(file_path, size, lines, len(objects), read - start, time.perf_counter() - read, False)
+
+	def get_cache_signature(self, objpath: str) -> str:
+		"""
+			Return a string that identifies how files are parsed for this GameObject
+			The cache is thrown away when the signature changes, so anything that changes the parsing output has to be included
+		"""
+		return dumps([
+			objpath,
+			self.level,
+			sorted(self.ignored_files),
+			sorted(self.included_files),
+			sorted(self.exclusion_keys)
+		])
+
+
+def create_executor(executor: str, max_workers=None) -> Optional[Executor]:
+	"""
+		Start the pool for an executor option, "thread" or "process", and return None for "serial"
+		The pool can be passed as the executor of several GameObjects so they all share it
+	"""
+	if executor == "serial":
+		return None
+	if executor == "thread":
+		return ThreadPoolExecutor(max_workers)
+	if executor == "process":
+		return ProcessPoolExecutor(max_workers)
+	raise ValueError(f"Unknown executor '{executor}', expected 'serial', 'thread', 'process' or an Executor")
+
+
+def map_executor(pool: Optional[Executor], function, items: list, max_workers=None) -> list:
+	""" Call function on every item with the pool, or one by one when pool is None, and return the results in the same order as items """
+	if pool is None or len(items) < 2:
+		return [function(i) for i in items]
+	if isinstance(pool, ProcessPoolExecutor):
+		# Send items in chunks so each worker process isn't sent one small file at a time
+		workers = max_workers or os.cpu_count() or 1
+		chunksize = max(1, len(items) // (workers * 4))
+		return list(pool.map(function, items, chunksize=chunksize))
+	return list(pool.map(function, items))
+
+
+def get_block_pattern(max_depth: int, possessive=True) -> str:
+	"""
+		Return a pattern that matches a whole block, including up to max_depth nested blocks, with comments and quoted strings in it
+		This lets the scanner skip the contents of an object in one regex call instead of stepping through every brace
+		Possessive quantifiers (Python 3.11+) stop the engine from backtracking through skipped text when a block is nested too deep to match
+	"""
+	if possessive:
+		content = r'(?:[^{}#"\n]++|\n|#[^\n]*+|"(?:[^"\\\n]|\\.)*+")*+'
+	else:
+		content = r'(?:[^{}#"]|#[^\n]*|"(?:[^"\\\n]|\\.)*")*'
+	block = r'\{' + content + r'\}'
+	for i in range(max_depth):
+		block = r'\{' + content + r'(?:' + block + content + r')*\}'
+	return block
+
+
+def compile_script_patterns(binary=False) -> tuple:
+	"""
+		Return the (script token, brace token, block) patterns used to scan files, for bytes if binary is True
+
+		The script token matches everything the key scanner cares about at the level keys are read at, anything else (values, whitespace) is skipped
+		Comments and quoted strings are matched as a whole so braces and operators inside of them are ignored
+		Group 1 is an opening brace, group 2 a closing brace and group 3 a key followed by an operator
+		When the value of the key is a block, group 4 is the whole block or group 5 is its opening brace if it is nested too deep to match
+
+		Only braces matter at any other level, so the brace token lets the regex engine skip everything else without returning to python
+	"""
+	comment_or_string = r'#[^\n]*|"(?:[^"\\\n]|\\.)*"'
+	for possessive in (True, False):
+		block = get_block_pattern(8, possessive)
+		patterns = (
+			comment_or_string + r'|(\{)|(\})|([^\s{}=<>!?#"]+)\s*(?:[<>!?]?=|[<>])\s*(?:(' + block + r')|(\{))?',
+			comment_or_string + r'|(\{)|(\})',
+			block
+		)
+		try:
+			return tuple(re.compile(i.encode() if binary else i) for i in patterns)
+		except re.error:
+			continue
+
+
+OPEN_BRACE, CLOSE_BRACE, KEY, KEY_BLOCK, KEY_OPEN_BRACE = range(1, 6)
+SCRIPT_TOKEN, BRACE_TOKEN, SCRIPT_BLOCK = compile_script_patterns()
+SCRIPT_TOKEN_BINARY, BRACE_TOKEN_BINARY, SCRIPT_BLOCK_BINARY = compile_script_patterns(binary=True)
+UTF8_BOM = b"\xef\xbb\xbf"
+
+
+def scan_keys(text, level: int, exclusion_keys=frozenset()) -> list:
+	"""
+		Return a list of (key, line) tuples for all keys that are at a brace depth of level in a script file
+		Keys with a block value are always found, at level 0 keys with a plain value like "key = value" are found as well
+		Blocks written on one line and indentation with any mix of tabs and spaces are handled because only braces are counted
+
+		text can be a str, or bytes-like object such as a memory mapped file, only the keys that are found are decoded then
+	"""
+	found = list()
+	depth = 0
+	line = 1
+	position = 0
+	end = 0
+	binary = not isinstance(text, str)
+	if binary:
+		search_keys = SCRIPT_TOKEN_BINARY.search
+		search_braces = BRACE_TOKEN_BINARY.search
+		if text[:3] == UTF8_BOM:
+			end = position = 3
+		# Memory mapped files can't count newlines in a range, so the range is sliced out first
+		count_lines = text.count if isinstance(text, bytes) else lambda x, start, end: text[start:end].count(x)
+		newline = b"\n"
+	else:
+		search_keys = SCRIPT_TOKEN.search
+		search_braces = BRACE_TOKEN.search
+		count_lines = text.count
+		newline = "\n"
+	while True:
+		match = search_keys(text, end) if depth == level else search_braces(text, end)
+		if match is None:
+			break
+		end = match.end()
+		kind = match.lastindex
+		if kind == OPEN_BRACE:
+			depth += 1
+		elif kind == CLOSE_BRACE:
+			if depth > 0:
+				depth -= 1
+		elif kind is not None:
+			# A key, comments and quoted strings don't have a group
+			# Nothing inside of a block at this level is needed so all of it is skipped by the match,
+			# blocks nested too deep for the pattern are stepped through brace by brace instead
+			key = match.group(KEY)
+			if binary:
+				key = str(key, "utf-8", "replace")
+			if (kind != KEY or level == 0) and key not in exclusion_keys and key[0] != "@":
+				start = match.start()
+				line += count_lines(newline, position, start)
+				position = start
+				found.append((key, line))
+			if kind == KEY_OPEN_BRACE:
+				depth += 1
+	return found
+
+
+def scan_file_keys(file_path: str, level: int, exclusion_keys=frozenset()) -> list:
+	"""
+		Return a list of (key, line) tuples for a file by scanning it memory mapped
+		The file is never read into a python string, only the keys that are found are decoded
+	"""
+	with open(file_path, "rb") as file:
+		if os.fstat(file.fileno()).st_size == 0:
+			return list()
+		with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+			return scan_keys(buffer, level, exclusion_keys)
+
+
+# Tokens of a single block level, the group that matched tells what kind of token it is
+# 1 comment, 2 quoted string, 3 brace, 4 operator, 5 inline math or a plain word
+VALUE_TOKEN = re.compile(r'(#[^\n]*)|("(?:[^"\\]|\\.)*")|([{}])|([<>!?=]=|[<>=])|(@\[[^\]]*\]|[^\s{}=<>!?#"]+)')
+COMMENT, STRING, BRACE, OPERATOR, WORD = range(1, 6)
+
+
+class ScriptEntry(NamedTuple):
+	"""
+		A single statement in a block
+		key and operator are None for values in a list like { 1 2 3 }
+		value is a string or a ScriptBlock, offset is the position of the statement in the file text
+	"""
+	key: Optional[str]
+	operator: Optional[str]
+	value: Any
+	offset: int
+
+
+class ScriptBlock:
+	"""
+		Lazily parsed block of Jomini script, a whole file is a block without braces
+		Only the position of the block in the text is stored until the entries are accessed for the first time,
+		nested blocks are skipped over and are only parsed when they are accessed themselves
+		tag is set for tagged blocks like rgb { 1 2 3 }
+	"""
+
+	__slots__ = ("text", "start", "end", "tag", "items")
+
+	def __init__(self, text: str, start=0, end=None, tag=None):
+		self.text = text
+		self.start = start  # Position of the first character inside of the braces
+		self.end = len(text) if end is None else end  # Position of the closing brace
+		self.tag = tag
+		self.items = None
+
+	@property
+	def entries(self) -> list:
+		""" Return a list of ScriptEntry for every statement in the block, parsing the block the first time """
+		if self.items is None:
+			self.items = parse_block(self.text, self.start, self.end)
+		return self.items
+
+	@property
+	def line(self) -> int:
+		""" Line number the block starts on """
+		return self.text.count("\n", 0, self.start) + 1
+
+	def __iter__(self):
+		return iter(self.entries)
+
+	def __len__(self):
+		return len(self.entries)
+
+	def __contains__(self, key):
+		return any(i.key == key for i in self.entries)
+
+	def __getitem__(self, key):
+		for i in self.entries:
+			if i.key == key:
+				return i.value
+		raise KeyError(key)
+
+	def get(self, key, default=None):
+		""" Return the value of the first statement with key, or default if there isn't one """
+		for i in self.entries:
+			if i.key == key:
+				return i.value
+		return default
+
+	def get_all(self, key) -> list:
+		""" Return the values of all statements with key, keys like modifier can be repeated in a block """
+		return [i.value for i in self.entries if i.key == key]
+
+	def keys(self) -> list:
+		return [i.key for i in self.entries if i.key is not None]
+
+	def values(self) -> list:
+		""" Return the values of a list block like { 1 2 3 } """
+		return [i.value for i in self.entries if i.key is None]
+
+	def to_python(self):
+		"""
+			Return the block fully parsed into python types
+			Blocks with only keys become dictionaries (repeated keys get a list of values), blocks with only values become lists,
+			and blocks that mix them become a list of (key, operator, value) tuples. Operators other than = are only kept in that last form
+		"""
+		entries = self.entries
+		if all(i.key is None for i in entries):
+			return [to_python(i.value) for i in entries]
+		if any(i.key is None or i.operator != "=" for i in entries):
+			return [(i.key, i.operator, to_python(i.value)) for i in entries]
+		d = dict()
+		for i in entries:
+			value = to_python(i.value)
+			if i.key not in d:
+				d[i.key] = value
+			elif isinstance(d[i.key], RepeatedValues):
+				d[i.key].append(value)
+			else:
+				d[i.key] = RepeatedValues([d[i.key], value])
+		return d
+
+	def find(self, key: str, start: int, end: int):
+		"""
+			Return the ScriptEntry for key that is between the start and end positions of the text, in this block or any nested block
+			Used to find the value of a key when only the line it is on is known
+		"""
+		for i in self.entries:
+			if i.key == key and start <= i.offset < end:
+				return i
+		for i in self.entries:
+			if isinstance(i.value, ScriptBlock) and i.value.start <= end and start <= i.value.end:
+				found = i.value.find(key, start, end)
+				if found is not None:
+					return found
+		return None
+
+
+class RepeatedValues(list):
+	""" List of values for a key that is repeated in a block, so it can be told apart from a list block """
+
+
+def to_python(value):
+	return value.to_python() if isinstance(value, ScriptBlock) else value
+
+
+def find_block_end(text: str, start: int) -> int:
+	""" Return the position of the brace that closes the block opening at start, or the end of the text if it is never closed """
+	match = SCRIPT_BLOCK.match(text, start)
+	if match is not None:
+		return match.end() - 1
+	depth = 0
+	for match in BRACE_TOKEN.finditer(text, start):
+		if match.lastindex == OPEN_BRACE:
+			depth += 1
+		elif match.lastindex == CLOSE_BRACE:
+			depth -= 1
+			if depth == 0:
+				return match.start()
+	return len(text)
+
+
+def unquote(token: str) -> str:
+	return token[1:-1].replace('\\"', '"') if token[0] == '"' else token
+
+
+def parse_block(text: str, start: int, end: int) -> list:
+	""" Return a list of ScriptEntry for the statements between start and end, nested blocks are not parsed """
+	entries = list()
+	pending = None  # Token waiting for an operator, it is a list value if no operator comes
+	pending_offset = 0
+	operator = None
+	tag_allowed = False  # The last entry was key = word, so a block right after it is a tagged block like rgb { }
+	position = start
+	while position < end:
+		match = VALUE_TOKEN.search(text, position, end)
+		if match is None:
+			break
+		kind = match.lastindex
+		position = match.end()
+		if kind == COMMENT:
+			continue
+		if kind == OPERATOR:
+			if pending is not None:
+				operator = match.group()
+			tag_allowed = False
+			continue
+		if kind == BRACE:
+			if match.group() == "}":
+				# Stray closing brace, there is nothing else in this block to parse
+				break
+			block_end = find_block_end(text, match.start())
+			position = block_end + 1
+			if operator is not None:
+				entries.append(ScriptEntry(unquote(pending), operator, ScriptBlock(text, match.end(), block_end), pending_offset))
+				pending = operator = None
+			elif tag_allowed:
+				last = entries[-1]
+				entries[-1] = ScriptEntry(last.key, last.operator, ScriptBlock(text, match.end(), block_end, last.value), last.offset)
+			else:
+				if pending is not None:
+					entries.append(ScriptEntry(None, None, unquote(pending), pending_offset))
+					pending = None
+				entries.append(ScriptEntry(None, None, ScriptBlock(text, match.end(), block_end), match.start()))
+			tag_allowed = False
+			continue
+		# A quoted string or a word
+		if operator is not None:
+			entries.append(ScriptEntry(unquote(pending), operator, unquote(match.group()), pending_offset))
+			tag_allowed = kind == WORD
+			pending = operator = None
+			continue
+		tag_allowed = False
+		if pending is not None:
+			entries.append(ScriptEntry(None, None, unquote(pending), pending_offset))
+		pending = match.group()
+		pending_offset = match.start()
+	if pending is not None:
+		entries.append(ScriptEntry(None, None, unquote(pending), pending_offset))
+	return entries
+
+
+def parse_script(text: str) -> ScriptBlock:
+	"""
+		Return the root block of a script file
+		Nothing is parsed until the entries of a block are accessed
+	"""
+	return ScriptBlock(text[1:] if text.startswith("\ufeff") else text)
+
+
+class ScriptFile:
+	""" A parsed script file along with the modified time and size it had when it was read """
+
+	def __init__(self, path: str):
+		stat = os.stat(path)
+		self.path = path
+		self.mtime = stat.st_mtime_ns
+		self.size = stat.st_size
+		with open(path, "r", encoding="utf-8-sig") as file:
+			self.root = parse_script(file.read())
+		self.line_offsets = None
+
+	def is_current(self) -> bool:
+		""" Check if the file has not changed since it was read """
+		try:
+			stat = os.stat(self.path)
+		except OSError:
+			return False
+		return stat.st_mtime_ns == self.mtime and stat.st_size == self.size
+
+	def find(self, key: str, line: int):
+		""" Return the ScriptEntry for key on a line of the file, or None if it isn't found """
+		if self.line_offsets is None:
+			text = self.root.text
+			self.line_offsets = [0] + [i.end() for i in re.finditer("\n", text)] + [len(text) + 1]
+		if line < 1 or line >= len(self.line_offsets):
+			return None
+		return self.root.find(key, self.line_offsets[line - 1], self.line_offsets[line])
+
+
+# Script files that have been parsed for their values, shared by all GameObjects
+script_files = dict()
+script_files_lock = Lock()
+
+
+def get_script_file(path: str) -> ScriptFile:
+	""" Return the parsed ScriptFile for a path, the file is read again if it changed since it was last parsed """
+	with script_files_lock:
+		script_file = script_files.get(path)
+		if script_file is None or not script_file.is_current():
+			script_file = ScriptFile(path)
+			script_files[path] = script_file
+		return script_file
+
+
+# Binary snapshots start with a header and a directory of sections, every section is an array of one type aligned to 8 bytes
+SNAPSHOT_MAGIC = b"PDXS"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_HEADER = struct.Struct("<4sIII")  # magic, format version, 1 if little endian, number of sections
+SNAPSHOT_SECTION = struct.Struct("<16sc7xQQ")  # name, array typecode, offset, number of items
+# String index for a missing string
+NO_STRING = 0xFFFFFFFF
+
+
+@contextmanager
+def atomic_write(path: str, mode="wb", encoding=None):
+	"""
+		Open a temporary file next to path for writing and replace path with it once the with block is done
+		A crash or an error while writing never leaves a broken file at path, and the temporary file is removed on errors
+	"""
+	directory = os.path.dirname(path)
+	if directory:
+		os.makedirs(directory, exist_ok=True)
+	temp_path = path + ".tmp"
+	try:
+		with open(temp_path, mode, encoding=encoding) as file:
+			yield file
+		os.replace(temp_path, path)
+	except BaseException:
+		try:
+			os.remove(temp_path)
+		except OSError:
+			pass
+		raise
+
+
+class SnapshotWriter:
+	"""
+		Build a binary snapshot: named arrays of numbers, and a table of strings that the arrays refer to by index
+		Every string is only stored once no matter how many times it is added
+	"""
+
+	def __init__(self):
+		self.sections = dict()
+		self.strings = list()
+		self.string_ids = dict()
+
+	def string(self, value: str) -> int:
+		""" Return the index of a string in the string table, adding it if it isn't in it yet """
+		string_id = self.string_ids.get(value)
+		if string_id is None:
+			string_id = len(self.strings)
+			self.strings.append(value)
+			self.string_ids[value] = string_id
+		return string_id
+
+	def strings_array(self, values: list) -> array:
+		""" Add every string in a list and return an array of their indexes, faster than calling string() for each of them """
+		string_ids = self.string_ids
+		for value in dict.fromkeys(values):
+			if value not in string_ids:
+				string_ids[value] = len(self.strings)
+				self.strings.append(value)
+		return array("I", map(string_ids.__getitem__, values))
+
+	def add(self, name: str, typecode: str, values) -> None:
+		""" Add an array section, typecode is an array module typecode """
+		if len(name.encode("ascii")) > SNAPSHOT_SECTION.size - 24:
+			raise ValueError(f"Snapshot section name '{name}' is longer than {SNAPSHOT_SECTION.size - 24} characters")
+		self.sections[name] = values if isinstance(values, array) else array(typecode, values)
+
+	def write(self, path: str) -> None:
+		""" Write the snapshot with atomic_write """
+		encoded = [i.encode("utf-8") for i in self.strings]
+		offsets = array("I", [0])
+		for i in encoded:
+			offsets.append(offsets[-1] + len(i))
+		sections = dict(self.sections)
+		sections["strings.offsets"] = offsets
+		sections["strings.data"] = array("B", b"".join(encoded))
+
+		directory = list()
+		position = SNAPSHOT_HEADER.size + SNAPSHOT_SECTION.size * len(sections)
+		for name, values in sections.items():
+			position += -position % 8
+			directory.append(SNAPSHOT_SECTION.pack(name.encode("ascii"), values.typecode.encode("ascii"), position, len(values)))
+			position += len(values) * values.itemsize
+
+		with atomic_write(path) as file:
+			file.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, sys.byteorder == "little", len(sections)))
+			file.write(b"".join(directory))
+			for values in sections.values():
+				file.write(b"\0" * (-file.tell() % 8))
+				values.tofile(file)
+
+
+class SnapshotReader:
+	"""
+		Memory mapped reader for a snapshot written by SnapshotWriter
+		Arrays are memoryviews of the mapped file so nothing is copied or decoded until a value is read
+		Raises ValueError if the file isn't a snapshot this version can read, close() has to be called before the file can be replaced on Windows
+	"""
+
+	def __init__(self, path: str):
+		self.views = list()
+		self.sections = dict()
+		self.string_start = 0
+		with open(path, "rb") as file:
+			self.buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+		try:
+			self.read_directory()
+		except (ValueError, TypeError, struct.error):
+			self.close()
+			raise ValueError(f"{path} is not a valid snapshot")
+
+	def read_directory(self) -> None:
+		magic, version, little_endian, count = SNAPSHOT_HEADER.unpack_from(self.buffer, 0)
+		if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION or little_endian != (sys.byteorder == "little"):
+			raise ValueError
+		view = memoryview(self.buffer)
+		self.views.append(view)
+		for i in range(count):
+			name, typecode, offset, length = SNAPSHOT_SECTION.unpack_from(self.buffer, SNAPSHOT_HEADER.size + SNAPSHOT_SECTION.size * i)
+			typecode = typecode.decode("ascii")
+			size = length * array(typecode).itemsize
+			if offset + size > len(self.buffer):
+				raise ValueError
+			section = view[offset:offset + size].cast(typecode)
+			self.views.append(section)
+			name = name.rstrip(b"\0").decode("ascii")
+			self.sections[name] = section
+			if name == "strings.data":
+				self.string_start = offset
+		self.string_offsets = self.sections["strings.offsets"]
+
+	def array(self, name: str) -> memoryview:
+		return self.sections[name]
+
+	def strings(self) -> list:
+		""" Decode the whole string table at once, faster than string() when most strings are needed """
+		data = self.sections["strings.data"].tobytes()
+		offsets = self.string_offsets.tolist()
+		return [data[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+
+	def string(self, string_id: int) -> str:
+		# Slicing the map directly is faster than decoding a memoryview
+		start = self.string_start
+		return self.buffer[start + self.string_offsets[string_id]:start + self.string_offsets[string_id + 1]].decode("utf-8")
+
+	def close(self) -> None:
+		# Every view has to be released before the map can be closed
+		for i in reversed(self.views):
+			i.release()
+		self.views = list()
+		self.sections = dict()
+		self.buffer.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+
+class GameObjectCache:
+	"""
+		Persistent cache of the objects found in each file of a GameObject
+		Files are fingerprinted by their modified time and size, if use_hash is True the contents are
+		hashed as well so a file that was only touched or copied doesn't need to be parsed again
+
+		The cache is a binary snapshot with one string table for paths, keys and hashes and arrays for everything else,
+		it is memory mapped when loaded and a file's objects are only decoded when that file is looked up
+	"""
+
+	# Bump this whenever the cache format or the output of parsing changes so old caches are thrown away
+	version = 3
+
+	def __init__(self, path: str, signature: str, use_hash=False):
+		self.path = path
+		self.signature = signature
+		self.use_hash = use_hash
+		self.reader = None
+		# Index of every file in the snapshot
+		self.files = dict()
+		# (modified time, size, hash, objects) for every file seen this run, files that no longer exist are dropped when saving
+		self.used = dict()
+		self.changed = False
+		self.load()
+
+	def load(self) -> None:
+		try:
+			reader = SnapshotReader(self.path)
+		except (OSError, ValueError):
+			return
+		try:
+			meta = reader.array("meta")
+			if meta[0] != self.version or reader.string(meta[1]) != self.signature:
+				reader.close()
+				return
+			paths = reader.array("file.path")
+			self.files = {reader.string(paths[i]): i for i in range(len(paths))}
+		except (KeyError, IndexError, UnicodeDecodeError):
+			reader.close()
+			self.files = dict()
+			return
+		self.reader = reader
+
+	def close(self) -> None:
+		""" Unmap the snapshot, entries that were looked up stay available """
+		if self.reader is not None:
+			self.reader.close()
+			self.reader = None
+			self.files = dict()
+
+	def save(self) -> None:
+		""" Write the cache to disk if anything changed """
+		unchanged = not self.changed and (self.reader is None or len(self.used) == len(self.files))
+		# Entries of every file that is still needed are in used by now, the snapshot is closed so it can be replaced on Windows
+		self.close()
+		if unchanged:
+			return
+		writer = SnapshotWriter()
+		paths, mtimes, sizes, hashes, firsts, counts = (array(i) for i in "IqQIII")
+		keys, lines = array("I"), array("I")
+		for file_path, (mtime, size, hash_value, objects) in self.used.items():
+			paths.append(writer.string(file_path))
+			mtimes.append(mtime)
+			sizes.append(size)
+			hashes.append(NO_STRING if hash_value is None else writer.string(hash_value))
+			firsts.append(len(keys))
+			counts.append(len(objects))
+			for key, line in objects:
+				keys.append(writer.string(key))
+				lines.append(line)
+		writer.add("meta", "I", [self.version, writer.string(self.signature)])
+		for name, values in (("file.path", paths), ("file.mtime", mtimes), ("file.size", sizes), ("file.hash", hashes),
+				("file.first", firsts), ("file.count", counts), ("object.key", keys), ("object.line", lines)):
+			writer.add(name, values.typecode, values)
+		writer.write(self.path)
+		self.changed = False
+
+	def read_entry(self, index: int) -> tuple:
+		""" Return the (modified time, size, hash, objects) of a file in the snapshot """
+		reader = self.reader
+		first = reader.array("file.first")[index]
+		end = first + reader.array("file.count")[index]
+		string = reader.string
+		objects = [(string(key), line) for key, line in zip(reader.array("object.key")[first:end], reader.array("object.line")[first:end])]
+		hash_id = reader.array("file.hash")[index]
+		hash_value = None if hash_id == NO_STRING else string(hash_id)
+		return reader.array("file.mtime")[index], reader.array("file.size")[index], hash_value, objects
+
+	def get(self, file_path: str):
+		"""
+			Return the cached list of (key, line) tuples for a file
+			Return None if the file isn't cached or has changed since it was cached
+		"""
+		entry = self.used.get(file_path)
+		if entry is None:
+			index = self.files.get(file_path)
+			if index is None:
+				return None
+			entry = self.read_entry(index)
+		try:
+			stat = os.stat(file_path)
+		except OSError:
+			return None
+		mtime, size, hash_value, objects = entry
+		if mtime != stat.st_mtime_ns or size != stat.st_size:
+			if not self.use_hash or size != stat.st_size or hash_value != file_hash(file_path):
+				return None
+			entry = (stat.st_mtime_ns, size, hash_value, objects)
+			self.changed = True
+		self.used[file_path] = entry
+		return objects
+
+	def set(self, file_path: str, objects: list) -> None:
+		stat = os.stat(file_path)
+		hash_value = file_hash(file_path) if self.use_hash else None
+		self.used[file_path] = (stat.st_mtime_ns, stat.st_size, hash_value, objects)
+		self.changed = True
+
+	def discard(self, file_path: str) -> None:
+		""" Remove a file that no longer exists from the cache """
+		if self.used.pop(file_path, None) is not None:
+			self.changed = True
+		self.files.pop(file_path, None)
+
+
+def file_hash(file_path: str) -> str:
+	""" Return a hash of a files contents """
+	with open(file_path, "rb") as file:
+		return hashlib.sha1(file.read()).hexdigest()
+
+
+class FileStats(NamedTuple):
+	"""
+		How a single file was loaded, for files that came from the cache the times are 0 and lines is None since they are never read
+	"""
+	path: str
+	size: int
+	lines: Optional[int]
+	objects: int
+	read_time: float
+	parse_time: float
+	cached: bool
+
+
+class ParseProfile:
+	"""
+		Statistics recorded while a GameObject is loaded with profile=True
+		Every file gets a FileStats, every object directory records how many files and keys it replaced from earlier directories
+	"""
+
+	def __init__(self, name: str):
+		self.name = name
+		self.files = list()
+		self.directories = list()
+		self.total_time = 0.0
+		self.start_time = 0.0
+
+	def start(self) -> None:
+		self.start_time = time.perf_counter()
+
+	def stop(self) -> None:
+		self.total_time += time.perf_counter() - self.start_time
+
+	def add_file(self, stats: FileStats) -> None:
+		self.files.append(stats)
+
+	def add_directory(self, path: str, load_time: float, objects: int, overridden_keys: int, shadowed_files: set) -> None:
+		"""
+			Record an object directory after its objects were added
+			overridden_keys is how many of its keys were already defined by an earlier directory, shadowed_files is the set of
+			every file that was replaced, the ones that are in this directory are counted
+		"""
+		prefix = os.path.join(path, "")
+		self.directories.append({
+			"path": path,
+			"load_time": load_time,
+			"objects": objects,
+			"overridden_keys": overridden_keys,
+			"shadowed_files": sum(1 for i in shadowed_files if i.startswith(prefix)),
+		})
+
+	def slowest(self, n=10) -> list:
+		""" Return the FileStats of the n files that took the longest to read and parse """
+		return sorted(self.files, key=lambda x: x.read_time + x.parse_time, reverse=True)[:n]
+
+	def to_dict(self) -> dict:
+		files = [i._asdict() for i in self.files]
+		directories = list()
+		for directory in self.directories:
+			prefix = os.path.join(directory["path"], "")
+			directory_files = [i for i in self.files if i.path.startswith(prefix)]
+			directories.append(dict(
+				directory,
+				files=len(directory_files),
+				cached_files=sum(1 for i in directory_files if i.cached),
+				size=sum(i.size for i in directory_files),
+				read_time=sum(i.read_time for i in directory_files),
+				parse_time=sum(i.parse_time for i in directory_files),
+			))
+		return {
+			"name": self.name,
+			"total_time": self.total_time,
+			"files": len(self.files),
+			"cached_files": sum(1 for i in self.files if i.cached),
+			"size": sum(i.size for i in self.files),
+			"lines": sum(i.lines or 0 for i in self.files),
+			"objects": sum(i.objects for i in self.files),
+			"read_time": sum(i.read_time for i in self.files),
+			"parse_time": sum(i.parse_time for i in self.files),
+			"directories": directories,
+			"file_stats": files,
+		}
+
+	def to_json(self, indent=None) -> str:
+		return dumps(self.to_dict(), indent=indent)
+
+	def summary(self, n=10) -> str:
+		""" Return a table of the n slowest files """
+		lines = [f"{self.name}: {len(self.files)} files in {self.total_time * 1000:.1f} ms"]
+		for i in self.slowest(n):
+			total = (i.read_time + i.parse_time) * 1000
+			lines.append(
+				f"{total:9.2f} ms  read {i.read_time * 1000:8.2f} ms  parse {i.parse_time * 1000:8.2f} ms  "
+				f"{i.size:>9} bytes  {i.lines or 0:>7} lines  {i.objects:>6} objects  {i.path}"
+			)
+		return "\n".join(lines)
+
+
+class GameObjectLoader:
+	"""
+		Create several GameObjects at the same time, each type is an independent task on a bounded thread pool
+		game_object_types is a dictionary of names and GameObject classes (or any function that returns a GameObject)
+		progress is called from the pool thread with (name, game_object, completed, total) every time a type finishes loading,
+		before result() returns that type
+	"""
+
+	def __init__(self, game_object_types: dict, max_workers=None, progress=None):
+		self.game_object_types = game_object_types
+		self.max_workers = max_workers or max(1, min(len(game_object_types), os.cpu_count() or 1))
+		self.progress = progress
+		self.futures = dict()
+		self.completed = 0
+		self.lock = Lock()
+		self.pool = None
+
+	def start(self) -> dict:
+		""" Start loading every type and return a dictionary of names and futures """
+		if self.pool is not None:
+			return self.futures
+		self.pool = ThreadPoolExecutor(self.max_workers, thread_name_prefix="GameObjectLoader")
+		for name, game_object_type in self.game_object_types.items():
+			self.futures[name] = self.pool.submit(self.load, name, game_object_type)
+		# Let the pool threads exit once everything has been loaded
+		self.pool.shutdown(wait=False)
+		return self.futures
+
+	def load(self, name: str, game_object_type) -> GameObjectBase:
+		# Progress is reported inside of the task so it has always run by the time the future's result is available
+		game_object = game_object_type()
+		with self.lock:
+			self.completed += 1
+			completed = self.completed
+		if self.progress is not None:
+			self.progress(name, game_object, completed, len(self.game_object_types))
+		return game_object
+
+	def future(self, name: str) -> Future:
+		""" Return the future of a type so it can be awaited or given a callback """
+		return self.start()[name]
+
+	def result(self, name: str, timeout=None) -> GameObjectBase:
+		""" Wait for a single type and return it, any exception raised while loading it is raised here """
+		return self.future(name).result(timeout)
+
+	def is_done(self, name: str) -> bool:
+		return self.future(name).done()
+
+	def get_progress(self) -> tuple:
+		""" Return (completed, total) """
+		return (self.completed, len(self.game_object_types))
+
+	def wait(self, timeout=None) -> dict:
+		""" Wait for every type and return a dictionary of names and GameObjects """
+		return {name: future.result(timeout) for name, future in self.start().items()}
+
+
+# Words that could be a key, used to skip files that don't use any of the keys before looking for where they are used
+WORD_BINARY = re.compile(rb"\w+")
+# Comments and strings are matched as a whole, group 1 is a word in quotes like "roman" and group 2 a plain word
+REFERENCE_TOKEN_BINARY = re.compile(rb'#[^\n]*|"(\w+)"|(\w+)|"(?:[^"\\\n]|\\.)*"')
+
+
+def scan_references(text, keys) -> dict:
+	"""
+		Return a dictionary of key: [line, ...] for every key in keys that is used in text
+		text is a bytes-like object such as a memory mapped file, keys is a set of bytes
+		A key is used when it is a whole word or a whole quoted string like culture = "roman", keys in comments and in longer strings are ignored
+	"""
+	found = keys.intersection(WORD_BINARY.findall(text))
+	if not found:
+		return dict()
+	count_lines = text.count if isinstance(text, bytes) else lambda x, start, end: text[start:end].count(x)
+	references = dict()
+	line = 1
+	position = 0
+	for match in REFERENCE_TOKEN_BINARY.finditer(text):
+		kind = match.lastindex
+		if kind is None:
+			continue
+		key = match.group(kind)
+		if key not in found:
+			continue
+		start = match.start()
+		line += count_lines(b"\n", position, start)
+		position = start
+		lines = references.setdefault(str(key, "utf-8"), list())
+		if not lines or lines[-1] != line:
+			lines.append(line)
+	return references
+
+
+def scan_file_references(file_path: str, keys) -> dict:
+	""" Return the references to keys in a file by scanning it memory mapped, see scan_references """
+	with open(file_path, "rb") as file:
+		if os.fstat(file.fileno()).st_size == 0:
+			return dict()
+		with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+			return scan_references(buffer, keys)
+
+
+class ReferenceIndex:
+	"""
+		Inverted index of where keys are used in the script files of the game and mods
+		roots are the game folder followed by mod folders in load order, directories are the folders in each root that are indexed
+		A file that is replaced by a file with the same path in a later root is not indexed, the game never reads it either
+
+		index = ReferenceIndex([vanilla_path, mod_path], cache_path="cache")
+		index.update(buildings.keys() + cultures.keys())
+		index.get("roman") -> [(path, line), ...]
+
+		Only the keys passed to update are indexed. The index is saved in cache_path/ReferenceIndex.json with the modified time and size of
+		every file, so update only scans files that changed since then. When keys are added only the files that use them are scanned again,
+		all of them are read once to find out which ones do.
+		Updates for a few files, like the ones from a file watcher, can pass save=False and call save once on shutdown if changed is True.
+	"""
+
+	# Bump this whenever the format of the index or the output of scan_references changes
+	version = 1
+
+	def __init__(self, roots: list, directories=("common", "events", "setup"), cache_path=""):
+		self.roots = [i for i in roots if i]
+		self.directories = directories
+		self.path = os.path.join(cache_path, "ReferenceIndex.json") if cache_path else ""
+		self.keys = set()
+		# path: [modified time, size, {key: [line, ...]}]
+		self.files = dict()
+		# key: {path: [line, ...]}
+		self.references = dict()
+		# True when the index has changed since it was last saved
+		self.changed = False
+		# lock guards the index while it is changed, update_lock makes sure only one update runs at a time
+		self.lock = Lock()
+		self.update_lock = Lock()
+		self.load()
+
+	def load(self) -> None:
+		if not self.path:
+			return
+		try:
+			with open(self.path, "r", encoding="utf-8") as file:
+				data = json.load(file)
+		except (OSError, ValueError):
+			return
+		if data.get("version") != self.version or data.get("roots") != self.roots:
+			return
+		self.keys = set(data.get("keys", list()))
+		self.files = data.get("files", dict())
+		for file_path, (mtime, size, references) in self.files.items():
+			self.add_file_references(file_path, references)
+
+	def save(self) -> None:
+		""" Write the index to disk with atomic_write """
+		if not self.path:
+			return
+		with self.lock:
+			data = {"version": self.version, "roots": self.roots, "keys": sorted(self.keys), "files": self.files}
+			with atomic_write(self.path, "w", encoding="utf-8") as file:
+				json.dump(data, file)
+			self.changed = False
+
+	def get_files(self) -> list:
+		""" Return every script file in the indexed directories of all roots, leaving out files replaced by a later root """
+		files = list()
+		for directory in self.directories:
+			paths = [os.path.join(root, directory) for root in self.roots]
+			files += resolve_script_files([i for i in paths if os.path.isdir(i)])[0]
+		return files
+
+	def update(self, keys=None, changed_files=(), save=True) -> bool:
+		"""
+			Bring the index up to date with the files on disk and return True if any references changed
+			keys replaces the set of indexed keys, changed_files are paths that should be scanned again even if their modified time is the same
+			The index is written to disk when it changed unless save is False
+		"""
+		with self.update_lock:
+			changed = self.update_files(keys, changed_files)
+			if save and self.changed:
+				self.save()
+			return changed
+
+	def update_files(self, keys, changed_files) -> bool:
+		keys = self.keys if keys is None else set(keys)
+		changed_files = set(changed_files)
+		added_keys = frozenset(i.encode("utf-8") for i in keys - self.keys)
+		removed_keys = self.keys - keys
+		all_keys = frozenset(i.encode("utf-8") for i in keys)
+
+		updates = dict()
+		files = self.get_files()
+		for file_path in files:
+			try:
+				stat = os.stat(file_path)
+			except OSError:
+				continue
+			entry = self.files.get(file_path)
+			if entry is None or entry[0] != stat.st_mtime_ns or entry[1] != stat.st_size or file_path in changed_files:
+				references = scan_file_references(file_path, all_keys)
+			elif added_keys or removed_keys:
+				references = {key: lines for key, lines in entry[2].items() if key not in removed_keys}
+				if added_keys:
+					references.update(scan_file_references(file_path, added_keys))
+			else:
+				continue
+			updates[file_path] = [stat.st_mtime_ns, stat.st_size, references]
+		deleted = self.files.keys() - set(files)
+
+		changed = bool(deleted) or any(
+			file_path not in self.files or self.files[file_path][2] != entry[2] for file_path, entry in updates.items()
+		)
+		with self.lock:
+			for file_path in deleted:
+				self.remove_file_references(file_path, self.files.pop(file_path)[2])
+			for file_path, entry in updates.items():
+				if file_path in self.files:
+					self.remove_file_references(file_path, self.files[file_path][2])
+				self.files[file_path] = entry
+				self.add_file_references(file_path, entry[2])
+			self.keys = keys
+			if updates or deleted or added_keys or removed_keys:
+				self.changed = True
+		return changed
+
+	def add_file_references(self, file_path: str, references: dict) -> None:
+		for key, lines in references.items():
+			self.references.setdefault(key, dict())[file_path] = lines
+
+	def remove_file_references(self, file_path: str, references: dict) -> None:
+		for key in references:
+			paths = self.references.get(key)
+			if paths is not None:
+				paths.pop(file_path, None)
+				if not paths:
+					del self.references[key]
+
+	def get(self, key: str) -> list:
+		""" Return a list of (path, line) tuples for every place key is used, sorted by path and line """
+		with self.lock:
+			paths = self.references.get(key)
+			if paths is None:
+				return list()
+			return [(path, line) for path in sorted(paths) for line in paths[path]]
+
+	def count(self, key: str) -> int:
+		""" Return the number of lines key is used on """
+		with self.lock:
+			return sum(len(i) for i in self.references.get(key, dict()).values())
+
+
+def walk_script_files(path: str, ignored_files=(), included_files=()) -> list:
+	"""
+		Return the paths of all script files in a directory and its subdirectories
+		Files are sorted by name in each directory so the load order is the same on every platform
+		Files named in ignored_files are left out, if included_files isn't empty only files named in it are returned
+	"""
+	files = list()
+	subdirectories = list()
+	with os.scandir(path) as entries:
+		for entry in sorted(entries, key=lambda x: x.name):
+			if entry.is_dir():
+				subdirectories.append(entry.path)
+			elif entry.name.endswith(".txt"):
+				if entry.name in ignored_files:
 					continue
-				if self.included_files and filename not in self.included_files:
+				if included_files and entry.name not in included_files:
 					continue
-				file_path = os.path.join(dirpath, filename)
-				with open(file_path, "r", encoding='utf-8-sig') as file:
-					for i, line in enumerate(file):
-						if self.should_read(line):
-							found_item = line.split("=").pop(0).replace(" ", "").replace("\t", "")
-							if found_item:
-								obj_list.append(PdxScriptObject(found_item, file_path, i + 1))
-		return PdxScriptObjectType(obj_list)
+				files.append(entry.path)
+	for subdirectory in subdirectories:
+		files += walk_script_files(subdirectory, ignored_files, included_files)
+	return files
 
-	def should_read(self, x: str) -> bool:
-		# Check if a line should be read
-		y = x.split("#")[0]
-		z = y.split("=")[0]
-		# The long set is exclusion keys to not read when looking for top level keys
-		if "= {" in y and z.count("\t") + z.count("    ") == self.level and not z.strip() in self.exclusion_keys:
-			return True
-		w = y.find("=")
-		if w != -1 and self.level == 0:
-			w = y[0:w].rstrip()
-			if "\t" not in w and " " not in w:
-				return True
-
-		return False
+
+def resolve_script_files(directories: list, ignored_files=(), included_files=()) -> tuple:
+	"""
+		Return (files, shadowed_files) for the same folder of the game and mods, directories are in load order
+		A file is shadowed when a later directory has a file with the same path relative to the directory, the game only reads the last one
+		files are the script files that aren't shadowed in load order and shadowed_files is a set of the rest
+	"""
+	all_files = list()
+	winners = dict()
+	for directory in directories:
+		for file_path in walk_script_files(directory, ignored_files, included_files):
+			all_files.append(file_path)
+			winners[os.path.normcase(os.path.relpath(file_path, directory))] = file_path
+	winning_files = set(winners.values())
+	files = [i for i in all_files if i in winning_files]
+	return files, {i for i in all_files if i not in winning_files}
+
+
+def write_game_objects_snapshot(path: str, game_objects: dict) -> None:
+	"""
+		Write a dictionary of names and GameObjects to a binary snapshot that read_game_objects_snapshot can load
+		Every key and path is stored once in a string table, the objects of all GameObjects are stored in arrays of string indexes and lines
+	"""
+	writer = SnapshotWriter()
+	names, firsts, counts = array("I"), array("I"), array("I")
+	keys, paths, lines = array("I"), array("I"), array("I")
+	for name, game_object in game_objects.items():
+		names.append(writer.string(name))
+		firsts.append(len(keys))
+		counts.append(game_object.length())
+		for i in game_object:
+			keys.append(writer.string(i.key))
+			paths.append(writer.string(i.path))
+			lines.append(i.line)
+	for section, values in (("type.name", names), ("type.first", firsts), ("type.count", counts),
+			("object.key", keys), ("object.path", paths), ("object.line", lines)):
+		writer.add(section, values.typecode, values)
+	writer.write(path)
+
+
+def read_game_objects_snapshot(path: str) -> dict:
+	"""
+		Load a snapshot written by write_game_objects_snapshot and return a dictionary of names and GameObjects
+		Like dict_to_game_object the GameObjects only have their objects, they can't be reloaded
+	"""
+	game_objects = dict()
+	with SnapshotReader(path) as reader:
+		string = reader.string
+		names, firsts, counts = reader.array("type.name"), reader.array("type.first"), reader.array("type.count")
+		keys, paths, lines = reader.array("object.key"), reader.array("object.path"), reader.array("object.line")
+		# Paths are shared by many objects so each one is only decoded and added to the path table once
+		path_ids = dict()
+		new_object = PdxScriptObject.__new__
+		intern = sys.intern
+		for i in range(len(names)):
+			start = firsts[i]
+			end = start + counts[i]
+			objects = dict()
+			for key, path_id, line in zip(keys[start:end], paths[start:end], lines[start:end]):
+				table_id = path_ids.get(path_id)
+				if table_id is None:
+					table_id = path_ids[path_id] = path_table.get_id(string(path_id))
+				obj = new_object(PdxScriptObject)
+				obj.key = intern(string(key))
+				obj.path_id = table_id
+				obj.line = line
+				objects[obj.key] = obj
+			game_object = GameObjectBase()
+			game_object.main = PdxScriptObjectType(list())
+			game_object.main.objects = objects
+			game_objects[string(names[i])] = game_object
+	return game_objects
 
 
 def dict_to_game_object(objects: dict) -> GameObjectBase:
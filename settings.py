@@ -15,6 +15,8 @@ class Settings:
         self.ui_scaling = ""
         self.layout = ""
         self.menu_style = ""
+        self.parse_executor = "serial"
+        self.profile_parsing = False
         # Data Settings
         self.pop_types = list()
         self.terrain_types = list()
@@ -39,6 +41,8 @@ class Settings:
             f.write(f'"ui_scaling": "{self.ui_scaling}",\n\t')
             f.write(f'"layout": "{self.layout}",\n\t')
             f.write(f'"menu_style": "{self.menu_style}",\n\t')
+            f.write(f'"parse_executor": "{self.parse_executor}",\n\t')
+            f.write(f'"profile_parsing": {str(self.profile_parsing).lower()},\n\t')
             f.write(
                 f'"using_base_game_province_definitions": {str(self.using_base_game_province_definitions).lower()}\n'
             )
@@ -72,6 +76,10 @@ class Settings:
         self.color_scheme = settings["color_scheme"]
         self.menu_style = settings["menu_style"]
         self.ui_scaling = settings["ui_scaling"]
+        # How game files are parsed, "serial", "thread" or "process"
+        self.parse_executor = settings.get("parse_executor", "serial")
+        # Record how long every game file takes to load, reports are written to the cache folder
+        self.profile_parsing = settings.get("profile_parsing", False)
 
         if self.using_base_game_province_definitions:
             self.definition_csv = self.path_to_base_game + "/map_data/definition.csv"
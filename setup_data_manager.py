@@ -1,16 +1,27 @@
 import tkinter as tk
 import customtkinter
 import pandas as pd
+import numpy as np
+import os
 import math
 import re
+import gc
+import time
+import codecs
+import queue
+import functools
 import warnings
 import threading
-from tkinter import filedialog
+import multiprocessing
+from array import array
+from itertools import accumulate, chain
+from tkinter import filedialog, messagebox
 from platform import system
 from pathlib import Path
 from PIL import Image, ImageTk, ImageGrab, ImageFile
 from settings import Settings
 from jomini import *
+from file_watcher import FileWatcher
 from CTkExtensions.CTkScrollableDropdown import *
 from CTkExtensions.CTkToolTip import *
 from CTkExtensions.CTkMenuBar import *
@@ -24,194 +35,417 @@ customtkinter.set_widget_scaling(int(settings.ui_scaling.replace("%", "")) / 100
 
 # Global Variables
 OS = system()
+# Provinces that were edited in the editor and their latest data
 changed_provinces = set()
 changed_provinces_data = dict()
+# Edited provinces whose data really differs from their setup file, only these are written
+modified_provinces = set()
+# Provinces whose name was edited, they are written again so the name after their id in the setup file is updated
+renamed_provinces = set()
+# Parsed province setup data and the setup file of each province, both by province id
+all_province_data = dict()
+id_to_file_dict = dict()
+# Parsed game files are cached here so only changed files are parsed on startup
+CACHE_PATH = "cache"
+# GameObjects loaded at startup by the name of the setting their keys are stored in
+game_objects = dict()
+# (setting name, keys) of GameObjects reloaded by the file watcher, applied to the UI on the UI thread
+game_object_updates = queue.Queue()
+# Pool every file parsed on startup is parsed with, None when the parse_executor setting is "serial"
+parse_pool = None
+# Where the keys of every GameObject are used in the game and mod files
+reference_index = None
+# Columnar copy of all_province_data for filtering and aggregating provinces, kept in sync with edits
+province_table = None
+# Writes the setup files of edited provinces to the output folder in the background
+province_writer = None
 
 # Classes from sublime imperator plugin
 
 
 class ImperatorBuilding(GameObjectBase):
-    def __init__(self):
-        super().__init__([settings.path_to_mod], settings.path_to_base_game)
+    def __init__(self, executor="serial"):
+        super().__init__(
+            [settings.path_to_mod],
+            settings.path_to_base_game,
+            cache_path=CACHE_PATH,
+            executor=executor,
+            profile=settings.profile_parsing,
+        )
         self.get_data("common\\buildings")
 
 
 class ImperatorCulture(GameObjectBase):
-    def __init__(self):
-        super().__init__([settings.path_to_mod], settings.path_to_base_game, level=2)
+    def __init__(self, executor="serial"):
+        super().__init__(
+            [settings.path_to_mod],
+            settings.path_to_base_game,
+            level=2,
+            cache_path=CACHE_PATH,
+            executor=executor,
+            profile=settings.profile_parsing,
+        )
         self.get_data("common\\cultures")
 
 
 class ImperatorPop(GameObjectBase):
-    def __init__(self):
-        super().__init__([settings.path_to_mod], settings.path_to_base_game)
+    def __init__(self, executor="serial"):
+        super().__init__(
+            [settings.path_to_mod],
+            settings.path_to_base_game,
+            cache_path=CACHE_PATH,
+            executor=executor,
+            profile=settings.profile_parsing,
+        )
         self.get_data("common\\pop_types")
 
 
 class ImperatorProvinceRank(GameObjectBase):
-    def __init__(self):
-        super().__init__([settings.path_to_mod], settings.path_to_base_game)
+    def __init__(self, executor="serial"):
+        super().__init__(
+            [settings.path_to_mod],
+            settings.path_to_base_game,
+            cache_path=CACHE_PATH,
+            executor=executor,
+            profile=settings.profile_parsing,
+        )
         self.get_data("common\\province_ranks")
 
 
 class ImperatorReligion(GameObjectBase):
-    def __init__(self):
-        super().__init__([settings.path_to_mod], settings.path_to_base_game)
+    def __init__(self, executor="serial"):
+        super().__init__(
+            [settings.path_to_mod],
+            settings.path_to_base_game,
+            cache_path=CACHE_PATH,
+            executor=executor,
+            profile=settings.profile_parsing,
+        )
         self.get_data("common\\religions")
 
 
 class ImperatorTerrain(GameObjectBase):
-    def __init__(self):
-        super().__init__([settings.path_to_mod], settings.path_to_base_game)
+    def __init__(self, executor="serial"):
+        super().__init__(
+            [settings.path_to_mod],
+            settings.path_to_base_game,
+            cache_path=CACHE_PATH,
+            executor=executor,
+            profile=settings.profile_parsing,
+        )
         self.get_data("common\\terrain_types")
 
 
 class ImperatorTradeGood(GameObjectBase):
-    def __init__(self):
-        super().__init__([settings.path_to_mod], settings.path_to_base_game)
+    def __init__(self, executor="serial"):
+        super().__init__(
+            [settings.path_to_mod],
+            settings.path_to_base_game,
+            cache_path=CACHE_PATH,
+            executor=executor,
+            profile=settings.profile_parsing,
+        )
         self.get_data("common\\trade_goods")
 
 
+def order_pop_types(pop_types):
+    # Nobles are always shown first and slaves last
+    pop_types = list(pop_types)
+    if "nobles" in pop_types:
+        pop_types.remove("nobles")
+        pop_types.insert(0, "nobles")
+    if "slaves" in pop_types:
+        pop_types.remove("slaves")
+        pop_types.append("slaves")
+    return pop_types
+
+
+def get_game_object_keys(name, game_object):
+    keys = game_object.keys()
+    if name == "pop_types":
+        keys = order_pop_types(keys)
+    return keys
+
+
+def write_parse_profile(name, profile):
+    # Print the slowest files of a GameObject and write its full report to the cache folder
+    print(profile.summary(10))
+    path = os.path.join(CACHE_PATH, "profile")
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, f"{name}.json"), "w") as f:
+        f.write(profile.to_json(indent=4))
+
+
+def search_game_object(name):
+    # Return the autocomplete search of a GameObject dropdown, keys are looked up in the index of the GameObject
+    # so typing stays fast no matter how many keys there are, and keys added by the file watcher are found right away
+    def search(text):
+        return game_objects[name].search_keys(text, limit=100)
+
+    return search
+
+
+def start_parse_pool():
+    # Start the pool of the parse_executor setting that every GameObject and the province setup files share
+    global parse_pool
+    if parse_pool is None:
+        parse_pool = create_executor(settings.parse_executor)
+    return parse_pool
+
+
+def shutdown_parse_pool():
+    # Shut down the shared pool once everything has been loaded.
+    # The file watcher only reloads a few files at a time so GameObjects parse them without a pool from now on.
+    global parse_pool
+    for game_object in game_objects.values():
+        game_object.executor = "serial"
+    if parse_pool is not None:
+        parse_pool.shutdown()
+        parse_pool = None
+
+
 def add_game_objects_to_settings():
-    def load_first():
-        buildings = ImperatorBuilding()
-        settings.buildings = [x.key for x in buildings]
-        pop_types = ImperatorPop()
-        pop_types = [x.key for x in pop_types]
-        for i in pop_types:
-            if i == "nobles":
-                pop_types.remove(i)
-                pop_types.insert(0, i)
-            if i == "slaves":
-                pop_types.remove(i)
-                pop_types.append(i)
-
-        settings.pop_types = pop_types
-
-        province_ranks = ImperatorProvinceRank()
-        settings.province_ranks = [x.key for x in province_ranks]
-        religions = ImperatorReligion()
-        settings.religions = [x.key for x in religions]
-
-    def load_second():
-        cultures = ImperatorCulture()
-        settings.cultures = [x.key for x in cultures]
-        terrain_types = ImperatorTerrain()
-        settings.terrain_types = [x.key for x in terrain_types]
-        trade_goods = ImperatorTradeGood()
-        settings.trade_goods = [x.key for x in trade_goods]
-
-    thread1 = threading.Thread(target=load_first)
-    thread2 = threading.Thread(target=load_second)
-
-    thread1.start()
-    thread2.start()
-    thread1.join()
-    thread2.join()
+    # Start loading every GameObject type as its own task, each setting is filled in as soon as its type has loaded.
+    # Every type parses its files with the shared parse pool, shutdown_parse_pool has to be called after the loader is done.
+    # Returns the loader so callers can wait for only the types they need.
+    def loaded(name, game_object, completed, total):
+        game_objects[name] = game_object
+        setattr(settings, name, get_game_object_keys(name, game_object))
+        if game_object.profile is not None:
+            write_parse_profile(name, game_object.profile)
+
+    executor = start_parse_pool() or "serial"
+    game_object_types = {
+        "buildings": ImperatorBuilding,
+        "pop_types": ImperatorPop,
+        "province_ranks": ImperatorProvinceRank,
+        "religions": ImperatorReligion,
+        "cultures": ImperatorCulture,
+        "terrain_types": ImperatorTerrain,
+        "trade_goods": ImperatorTradeGood,
+    }
+    loader = GameObjectLoader(
+        {
+            name: functools.partial(game_object_type, executor)
+            for name, game_object_type in game_object_types.items()
+        },
+        progress=loaded,
+    )
+    loader.start()
+    return loader
+
+
+def get_reference_keys():
+    # Every key of every GameObject type is indexed
+    return [key for game_object in game_objects.values() for key in game_object.keys()]
+
+
+def start_reference_index():
+    # Update the index of where GameObject keys are used in a background thread.
+    # The index is loaded from the cache first so it can be searched while it is updated.
+    index = ReferenceIndex(
+        [settings.path_to_base_game, settings.path_to_mod], cache_path=CACHE_PATH
+    )
+    thread = threading.Thread(
+        target=index.update, args=(get_reference_keys(),), daemon=True
+    )
+    thread.start()
+    return index
+
+
+def watch_game_objects(index=None):
+    # Reload GameObjects in the background when their files are edited.
+    # Only the changed files are parsed again and the new keys are sent to the UI thread through game_object_updates.
+    # The reference index is updated with the changed files and any new keys as well, it is only saved when the app is closed
+    # so editing a file doesn't write the whole index again every time.
+    directories = [i for game_object in game_objects.values() for i in game_object.object_dirs]
+    if index is not None:
+        directories += [os.path.join(root, i) for root in index.roots for i in index.directories]
+
+    def reload_game_objects(changed_files):
+        for name, game_object in game_objects.items():
+            object_dirs = tuple(os.path.join(i, "") for i in game_object.object_dirs)
+            object_files = [i for i in changed_files if i.startswith(object_dirs)]
+            if object_files and game_object.reload(object_files):
+                game_object_updates.put((name, get_game_object_keys(name, game_object)))
+        if index is not None:
+            index.update(get_reference_keys(), changed_files, save=False)
+
+    watcher = FileWatcher(directories, reload_game_objects)
+    watcher.start()
+    return watcher
 
 
 # Non-GUI code
 
 
-class ProvinceData:
-    # All province data except for pops and buildings
-    def __init__(self, data):
-        self.province_id = ""
-        self.province_name = ""
-        self.terrain = ""
-        self.culture = ""
-        self.religion = ""
-        self.trade_goods = ""
-        self.province_rank = ""
-        self.civilization_value = ""
-        self.holy_site = ""
-
-        attr_list = [
-            "province_id",
-            "province_name",
-            "terrain",
-            "culture",
-            "religion",
-            "trade_goods",
-            "province_rank",
-            "civilization_value",
-            "holy_site",
-        ]
-        for attr, value in data:
-            if attr in attr_list:
-                setattr(self, attr, value)
-
-
-def update_pop_tuple(pop_tuple):
-    # Set default values for all tuples values for pops.
-    keyword, current_values = pop_tuple
-    keys = ["culture", "religion", "amount"]
-    new_values = []
-
-    for key in keys:
-        value = next((v for k, v in current_values if k == key), "")
-        new_values.append((key, value))
-
-    return keyword, new_values
-
-
-def get_province_output(province_data: dict):
-    # Return the output for a province that will be written to a province setup file
-
-    province = f'{province_data["province_id"]}={{ # {province_data["province_name"]}\n'
-    province += f'\tterrain="{province_data["terrain"]}"\n'
-    province += f'\tculture="{province_data["culture"]}"\n'
-    province += f'\treligion="{province_data["religion"]}"\n'
-    province += f'\ttrade_goods="{province_data["trade_good"]}"\n'
-    province += f'\tcivilization_value={province_data["civ_value"]}\n'
-    province += f"\tbarbarian_power=0\n"
-    province += f'\tprovince_rank="{province_data["province_rank"]}"\n'
-
-    # Pop format:
-    # li = [
-    #     ("citizen", [("culture", ""), ("religion", ""), ("amount", "3")]),
-    #     ("freemen", [("culture", ""), ("religion", ""), ("amount", "3")]),
-    #     ("slaves", [("culture", ""), ("religion", ""), ("amount", "3")]),
-    # ]
-    for i in province_data["pops"]:
-        province += f"\t{i[0]}={{\n"
-        if i[1][0][1] != "":
-            province += f'\t\tculture="{i[1][0][1]}"\n'
-        if i[1][1][1] != "":
-            province += f'\t\treligion="{i[1][1][1]}"\n'
-        province += f'\t\tamount="{i[1][2][1]}"\n'
-        province += "\t}\n"
-
-    holy_site = province_data["holy_site"]
-    if holy_site:
-        province += f'\tholy_site="{holy_site}"\n'
-
-    # Building format:
-    # li = [
-    #     ("port_building", "3"),
-    #     ("library_building", "2"),
-    #     ("commerce_building", "2"),
-    #     ("town_hall_building", "1"),
-    #     ("aqueduct_building", "2"),
-    # ]
-    for i in province_data["buildings"]:
-        province += f"\t{i[0]}={i[1]}\n"
-    province += "}\n"
-
-    return province
-
-
-def get_pops_and_buildings(current_data):
-    buildings = list()
-    pops = list()
-    for element in current_data:
-        if any(element[0].startswith(pop_type) for pop_type in settings.pop_types):
-            pops.append(element)
-        if element[0].endswith("_building"):
-            buildings.append(element)
+def parse_int(value, province_id=None, key=None):
+    # Setup files sometimes use decimals where the game expects whole numbers, they are rounded half up.
+    # Values that aren't numbers, like scripted values, are read as 0 so one province can't stop the whole setup from loading.
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return math.floor(float(value) + 0.5)
+    except (ValueError, OverflowError):
+        warnings.warn(
+            f"Province {province_id}: {key} has to be a number but is '{value}', 0 is used instead"
+        )
+        return 0
+
+
+class ProvinceRecord:
+    # Everything the editor knows about a province, built once when its setup file is parsed.
+    # Pop amounts and building counts are stored in arrays next to tuples of the pop types, cultures and religions
+    # and the building names, so showing or saving a province never has to scan its data again.
+    __slots__ = (
+        "province_id",
+        "terrain",
+        "culture",
+        "religion",
+        "trade_goods",
+        "province_rank",
+        "civilization_value",
+        "barbarian_power",
+        "holy_site",
+        "pop_types",
+        "pop_amounts",
+        "pop_cultures",
+        "pop_religions",
+        "building_types",
+        "building_counts",
+    )
 
-    pops = [update_pop_tuple(t) for t in pops]
-    return pops, buildings
+    def __init__(
+        self,
+        province_id,
+        terrain="",
+        culture="",
+        religion="",
+        trade_goods="",
+        province_rank="",
+        civilization_value=0,
+        barbarian_power=0,
+        holy_site="",
+        pops=(),
+        buildings=(),
+    ):
+        # pops are (pop type, amount, culture, religion) and buildings are (building, count)
+        self.province_id = province_id
+        self.terrain = terrain
+        self.culture = culture
+        self.religion = religion
+        self.trade_goods = trade_goods
+        self.province_rank = province_rank
+        self.civilization_value = civilization_value
+        self.barbarian_power = barbarian_power
+        self.holy_site = holy_site
+        self.set_pops(pops)
+        self.set_buildings(buildings)
+
+    def set_pops(self, pops):
+        self.pop_types = tuple(pop[0] for pop in pops)
+        self.pop_amounts = array("i", [pop[1] for pop in pops])
+        self.pop_cultures = tuple(pop[2] for pop in pops)
+        self.pop_religions = tuple(pop[3] for pop in pops)
+
+    def set_buildings(self, buildings):
+        self.building_types = tuple(building[0] for building in buildings)
+        self.building_counts = array("i", [building[1] for building in buildings])
+
+    def replace(self, **fields):
+        # Return a copy of the record with new values for some fields, records that were parsed are never changed.
+        # pops and buildings take the same lists as __init__, numeric fields are converted to int.
+        province = ProvinceRecord.__new__(ProvinceRecord)
+        for name in self.__slots__:
+            setattr(province, name, getattr(self, name))
+        for name, value in fields.items():
+            if name == "pops":
+                province.set_pops(value)
+            elif name == "buildings":
+                province.set_buildings(value)
+            elif name in PROVINCE_TEXT_FIELDS:
+                setattr(province, name, value)
+            elif name in PROVINCE_NUMERIC_FIELDS:
+                setattr(province, name, parse_int(value, self.province_id, name))
+            else:
+                raise ValueError(f"'{name}' is not a province field that can be edited")
+        return province
+
+    def pops(self):
+        # Return [(pop type, amount, culture, religion), ...], the arguments of ProvinceDataFrame.create_pop
+        return list(
+            zip(self.pop_types, self.pop_amounts, self.pop_cultures, self.pop_religions)
+        )
+
+    def buildings(self):
+        # Return [(building, count), ...], the arguments of ProvinceDataFrame.create_building
+        return list(zip(self.building_types, self.building_counts))
+
+    def fields(self):
+        # Every field as a tuple that can be compared and hashed, arrays are converted to tuples
+        return tuple(
+            tuple(value) if isinstance(value, array) else value
+            for value in (getattr(self, name) for name in self.__slots__)
+        )
+
+    def changed_fields(self, other):
+        # Return the names of the fields that are different in other.
+        # Pops and buildings are stored in several slots but are one field each, like the arguments of replace.
+        changed = [
+            name
+            for name in self.__slots__
+            if not name.startswith(("pop_", "building_"))
+            and getattr(self, name) != getattr(other, name)
+        ]
+        if self.pops() != other.pops():
+            changed.append("pops")
+        if self.buildings() != other.buildings():
+            changed.append("buildings")
+        return changed
+
+    def __eq__(self, other):
+        if not isinstance(other, ProvinceRecord):
+            return NotImplemented
+        return self.fields() == other.fields()
+
+    def __hash__(self):
+        return hash(self.fields())
+
+
+def get_province_output(province: ProvinceRecord, province_name, extra_entries=()):
+    # Return the output for a province that will be written to a province setup file.
+    # extra_entries are lines the editor doesn't know about, they are written as they are at the end of the province.
+
+    output = f"{province.province_id}={{ # {province_name}\n"
+    output += f'\tterrain="{province.terrain}"\n'
+    output += f'\tculture="{province.culture}"\n'
+    output += f'\treligion="{province.religion}"\n'
+    output += f'\ttrade_goods="{province.trade_goods}"\n'
+    output += f"\tcivilization_value={province.civilization_value}\n"
+    output += f"\tbarbarian_power={province.barbarian_power}\n"
+    output += f'\tprovince_rank="{province.province_rank}"\n'
+
+    for pop_type, amount, culture, religion in province.pops():
+        output += f"\t{pop_type}={{\n"
+        if culture != "":
+            output += f'\t\tculture="{culture}"\n'
+        if religion != "":
+            output += f'\t\treligion="{religion}"\n'
+        output += f"\t\tamount={amount}\n"
+        output += "\t}\n"
+
+    if province.holy_site:
+        output += f'\tholy_site="{province.holy_site}"\n'
+
+    for building, count in province.buildings():
+        output += f"\t{building}={count}\n"
+    for entry in extra_entries:
+        output += f"\t{entry}\n"
+    output += "}\n"
+
+    return output
 
 
 class ProvinceDefinition:
@@ -267,82 +501,531 @@ def load_definitions():
     return (province_list, rgb_list)
 
 
-def match_nested_brackets(text, start=0):
-    open_brackets = 0
-    for i, char in enumerate(text[start:]):
-        if char == "{":
-            open_brackets += 1
-        elif char == "}":
-            open_brackets -= 1
-            if open_brackets == 0:
-                return start + i
-    return None
-
-
-def get_provinces_in_file(text):
-    # Get the block of text for each province in a province setup file
-    pattern = re.compile(r"\d+={", re.DOTALL)
-    matches = pattern.finditer(text)
-    provinces = list()
-
-    for match in matches:
-        start = match.start()
-        end = match_nested_brackets(text, start + 1)
-        if end is not None:
-            provinces.append(text[start : end + 1])
-
-    return provinces
-
-
-def parse_province_data(text):
-    match = re.search(r"\d+", text)
-    if match:
-        province_id = match.group()
-
-    lines = text.split("\n")
-    parsed_data = [("province_id", province_id)]
-
-    for i in range(len(lines)):
-        line = lines[i].strip()
-
-        if any(line.startswith(pop_type) for pop_type in settings.pop_types):
-            block_name = line.split("=")[0].strip()
-            block_data = []
-            i += 1
-            line = lines[i].strip()
-
-            while line != "}":
-                key, value = line.split("=")
-                block_data.append((key.strip(), value.strip().strip('"')))
-                i += 1
-                line = lines[i].strip()
-
-            parsed_data.append((block_name, block_data))
-        elif "=" in line and not line.startswith(province_id):
-            key, value = line.split("=")
-            if key == "amount":
-                continue
-            if (key == "religion" or key == "culture") and i > 6:
+# Tokens that matter at the top level of a province setup file. Comments and strings are matched so braces in them
+# are skipped, a province id followed by "={" starts a province and any other brace only changes the depth.
+PROVINCE_TOKEN = re.compile(
+    r'#[^\n]*|"(?:[^"\\\n]|\\.)*"|(?<![\w.])(\d+)[ \t]*=[ \t]*(\{)|(\{)|(\})'
+)
+
+
+def get_province_offsets(text):
+    # Return (province id, start, end) for every province block in a province setup file, text[start:end] is the block.
+    # The file is walked once, the body of each province is skipped with a single match and nothing is copied.
+    offsets = list()
+    depth = 0
+    position = 0
+    length = len(text)
+    while True:
+        match = PROVINCE_TOKEN.search(text, position)
+        if match is None:
+            break
+        position = match.end()
+        if match.group(1) is not None:
+            if depth > 0:
+                depth += 1
                 continue
-            parsed_data.append((key.strip(), value.strip().strip('"')))
-
-    first_pop = ""
-    for i, data in enumerate(parsed_data):
-        if data[0] in settings.pop_types:
-            first_pop = i
-
-    pop_data_list = list()
-    extra_data = list()
-
-    if first_pop:
-        for i in parsed_data[first_pop:]:
-            if i[0] in settings.pop_types:
-                pop_data_list.append(i)
-            if i[0] in "holy_site" or re.search(r"_building$", i[0]):
-                extra_data.append(i)
-        return parsed_data[:first_pop] + pop_data_list + extra_data
-    else:
-        return parsed_data
+            end = find_block_end(text, match.start(2))
+            if end >= length:
+                # The province is never closed
+                break
+            offsets.append((match.group(1), match.start(), end + 1))
+            position = end + 1
+        elif match.group(3) is not None:
+            depth += 1
+        elif match.group(4) is not None and depth > 0:
+            depth -= 1
+    return offsets
+
+
+# key=value pairs, blocks and closing braces inside of a province block
+PROVINCE_FIELD = re.compile(
+    r'#[^\n]*|([\w.:@-]+)[ \t]*=[ \t]*(?:"([^"\n]*)"|(\{)|([^\s{}#"]+))|(\})'
+)
+# Fields of a province that are stored as text in a ProvinceRecord
+PROVINCE_TEXT_FIELDS = {
+    "terrain",
+    "culture",
+    "religion",
+    "trade_goods",
+    "province_rank",
+    "holy_site",
+}
+# Fields of a province that are stored as numbers in a ProvinceRecord
+PROVINCE_NUMERIC_FIELDS = {"civilization_value", "barbarian_power"}
+
+
+def get_block_values(text, start, end):
+    # Return the key=value pairs directly inside of text[start:end] as a dictionary
+    values = dict()
+    for match in PROVINCE_FIELD.finditer(text, start, end):
+        if match.group(1) is not None and match.group(3) is None:
+            values[match.group(1)] = match.group(2) if match.group(2) is not None else match.group(4)
+    return values
+
+
+def get_extra_entries(text, pop_types=None):
+    # Return the text of every entry in a province block that isn't stored in a ProvinceRecord, like "dummy = yes"
+    # or a block that isn't a pop, so they aren't lost when an edited province is written
+    if pop_types is None:
+        pop_types = settings.pop_types
+    entries = list()
+    position = text.index("{") + 1
+    end = len(text) - 1
+    while True:
+        match = PROVINCE_FIELD.search(text, position, end)
+        if match is None:
+            break
+        position = match.end()
+        key = match.group(1)
+        if key is None:
+            continue
+        if match.group(3) is not None:
+            position = find_block_end(text, match.start(3)) + 1
+            if key not in pop_types:
+                entries.append(text[match.start() : position])
+        elif not (
+            key.endswith("_building")
+            or key in PROVINCE_TEXT_FIELDS
+            or key in PROVINCE_NUMERIC_FIELDS
+        ):
+            entries.append(match.group())
+    return entries
+
+
+def parse_province_data(text, pop_types=None):
+    # Parse the block of a province returned by get_province_offsets into a ProvinceRecord
+    if pop_types is None:
+        pop_types = settings.pop_types
+    province_id = re.search(r"\d+", text).group()
+    fields = dict()
+    pops = list()
+    buildings = list()
+
+    position = text.index("{") + 1
+    end = len(text) - 1
+    while True:
+        match = PROVINCE_FIELD.search(text, position, end)
+        if match is None:
+            break
+        position = match.end()
+        key = match.group(1)
+        if key is None:
+            continue
+        if match.group(3) is not None:
+            # Pops are the only blocks inside of a province, anything else is skipped
+            block_end = find_block_end(text, match.start(3))
+            if key in pop_types:
+                values = get_block_values(text, position, block_end)
+                pops.append(
+                    (
+                        key,
+                        parse_int(
+                            values.get("amount", "0"), province_id, f"{key} amount"
+                        ),
+                        values.get("culture", ""),
+                        values.get("religion", ""),
+                    )
+                )
+            position = block_end + 1
+            continue
+        value = match.group(2) if match.group(2) is not None else match.group(4)
+        if key.endswith("_building"):
+            buildings.append((key, parse_int(value, province_id, key)))
+        elif key in PROVINCE_TEXT_FIELDS:
+            fields[key] = value
+        elif key in PROVINCE_NUMERIC_FIELDS:
+            fields[key] = parse_int(value, province_id, key)
+
+    return ProvinceRecord(province_id, pops=pops, buildings=buildings, **fields)
+
+
+def parse_province_file(path, pop_types):
+    # Parse every province in a province setup file.
+    # Pop types are passed in because worker processes don't load GameObjects into their settings.
+    with open(path, "r", encoding="utf-8-sig") as file:
+        text = file.read()
+    return [
+        parse_province_data(text[start:end], pop_types)
+        for province_id, start, end in get_province_offsets(text)
+    ]
+
+
+def parse_province_files(files, pop_types, executor=None):
+    # Parse province setup files with an Executor, or one by one when executor is None.
+    # Returns the provinces of each file in the same order as files.
+    function = functools.partial(parse_province_file, pop_types=pop_types)
+    return map_executor(executor, function, files)
+
+
+def merge_province_files(files, parsed_files):
+    # Merge the provinces of every file by province id, files have to be in a fixed order.
+    # A province that is in more than one file is taken from the last one like before,
+    # each of them is returned as (province id, file it was in, file it is taken from)
+    all_province_data = dict()
+    id_to_file_dict = dict()
+    duplicates = list()
+    for filename, provinces in zip(files, parsed_files):
+        for province in provinces:
+            if province.province_id in id_to_file_dict:
+                duplicates.append(
+                    (
+                        province.province_id,
+                        id_to_file_dict[province.province_id],
+                        filename,
+                    )
+                )
+            all_province_data[province.province_id] = province
+            id_to_file_dict[province.province_id] = filename
+    duplicates.sort(key=lambda duplicate: int(duplicate[0]))
+    return all_province_data, id_to_file_dict, duplicates
+
+
+class ProvinceSetupCache:
+    # Snapshot of the provinces parsed from every province setup file so only the files that changed since the last
+    # start are parsed again. Files are matched by their modified time and size.
+    # It is written with jomini's SnapshotWriter, text is stored once in a string table and everything else in arrays
+    # with a row for every file, province, pop and building. The whole snapshot is read at once when it is loaded.
+
+    # Bump this whenever the snapshot format or the output of parse_province_data changes
+    version = 1
+    # Arrays in the snapshot and their array module typecodes, "s" columns are indexes into the string table.
+    # Section names are limited to 16 characters.
+    FILE_ARRAYS = [("path", "s"), ("mtime", "q"), ("size", "Q"), ("first", "I"), ("count", "I")]
+    PROVINCE_ARRAYS = [
+        ("id", "s"),
+        ("terrain", "s"),
+        ("culture", "s"),
+        ("religion", "s"),
+        ("trade_goods", "s"),
+        ("rank", "s"),
+        ("holy_site", "s"),
+        ("civ_value", "i"),
+        ("barbarian", "i"),
+        ("pop_first", "I"),
+        ("pop_count", "I"),
+        ("bld_first", "I"),
+        ("bld_count", "I"),
+    ]
+    POP_ARRAYS = [("type", "s"), ("amount", "i"), ("culture", "s"), ("religion", "s")]
+    BUILDING_ARRAYS = [("type", "s"), ("count", "i")]
+
+    def __init__(self, path, pop_types):
+        self.path = path
+        # Pops are only parsed for known pop types, so provinces parsed with other pop types can't be used
+        self.signature = ",".join(sorted(pop_types))
+        # (modified time, size, provinces) by file path
+        self.files = dict()
+        self.changed = False
+        self.load()
+
+    def load(self):
+        try:
+            reader = SnapshotReader(self.path)
+        except (OSError, ValueError):
+            return
+        # Records don't have reference cycles, so the garbage collector only slows down creating this many of them
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            with reader:
+                self.files = self.read_files(reader)
+        except (KeyError, IndexError, UnicodeDecodeError):
+            self.files = dict()
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+    def read_files(self, reader):
+        strings = reader.strings()
+        meta = reader.array("meta")
+        if meta[0] != self.version or strings[meta[1]] != self.signature:
+            return dict()
+
+        def read_arrays(prefix, names):
+            # Strings are looked up for whole columns at once, numbers are kept as arrays that can be sliced
+            columns = list()
+            for name, typecode in names:
+                values = reader.array(f"{prefix}.{name}")
+                if typecode == "s":
+                    columns.append(list(map(strings.__getitem__, values)))
+                else:
+                    columns.append(array(typecode, values))
+            return columns
+
+        paths, mtimes, sizes, firsts, counts = read_arrays("file", self.FILE_ARRAYS)
+        province_columns = read_arrays("prov", self.PROVINCE_ARRAYS)
+        pop_types, pop_amounts, pop_cultures, pop_religions = read_arrays(
+            "pop", self.POP_ARRAYS
+        )
+        building_types, building_counts = read_arrays("bld", self.BUILDING_ARRAYS)
+
+        # Records are filled in directly, the columns are already in the layout ProvinceRecord uses
+        provinces = list()
+        for (
+            province_id,
+            terrain,
+            culture,
+            religion,
+            trade_goods,
+            province_rank,
+            holy_site,
+            civilization_value,
+            barbarian_power,
+            pop_first,
+            pop_count,
+            building_first,
+            building_count,
+        ) in zip(*province_columns):
+            province = ProvinceRecord.__new__(ProvinceRecord)
+            province.province_id = province_id
+            province.terrain = terrain
+            province.culture = culture
+            province.religion = religion
+            province.trade_goods = trade_goods
+            province.province_rank = province_rank
+            province.holy_site = holy_site
+            province.civilization_value = civilization_value
+            province.barbarian_power = barbarian_power
+            pop_end = pop_first + pop_count
+            province.pop_types = tuple(pop_types[pop_first:pop_end])
+            province.pop_amounts = pop_amounts[pop_first:pop_end]
+            province.pop_cultures = tuple(pop_cultures[pop_first:pop_end])
+            province.pop_religions = tuple(pop_religions[pop_first:pop_end])
+            building_end = building_first + building_count
+            province.building_types = tuple(building_types[building_first:building_end])
+            province.building_counts = building_counts[building_first:building_end]
+            provinces.append(province)
+
+        return {
+            path: (mtime, size, provinces[first : first + count])
+            for path, mtime, size, first, count in zip(paths, mtimes, sizes, firsts, counts)
+        }
+
+    def get(self, path):
+        # Return the provinces of a setup file, or None if the file isn't in the snapshot or has changed since
+        entry = self.files.get(path)
+        if entry is None:
+            return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        mtime, size, provinces = entry
+        if mtime != stat.st_mtime_ns or size != stat.st_size:
+            return None
+        return provinces
+
+    def set(self, path, provinces):
+        stat = os.stat(path)
+        self.files[path] = (stat.st_mtime_ns, stat.st_size, provinces)
+        self.changed = True
+
+    def save(self, paths):
+        # Write the snapshot if anything changed, files that are not in paths anymore are dropped from it
+        paths = set(paths)
+        for path in [i for i in self.files if i not in paths]:
+            del self.files[path]
+            self.changed = True
+        if not self.changed:
+            return
+
+        # Every array is built for a whole column at once
+        writer = SnapshotWriter()
+        strings = writer.strings_array
+        entries = list(self.files.values())
+        provinces = [province for mtime, size, file_provinces in entries for province in file_provinces]
+        file_counts = array("I", [len(i[2]) for i in entries])
+        file_columns = [
+            strings(list(self.files)),
+            array("q", [i[0] for i in entries]),
+            array("Q", [i[1] for i in entries]),
+            array("I", accumulate(file_counts, initial=0))[:-1],
+            file_counts,
+        ]
+        pop_counts = array("I", [len(i.pop_types) for i in provinces])
+        building_counts = array("I", [len(i.building_types) for i in provinces])
+        province_columns = [
+            strings([i.province_id for i in provinces]),
+            strings([i.terrain for i in provinces]),
+            strings([i.culture for i in provinces]),
+            strings([i.religion for i in provinces]),
+            strings([i.trade_goods for i in provinces]),
+            strings([i.province_rank for i in provinces]),
+            strings([i.holy_site for i in provinces]),
+            array("i", [i.civilization_value for i in provinces]),
+            array("i", [i.barbarian_power for i in provinces]),
+            array("I", accumulate(pop_counts, initial=0))[:-1],
+            pop_counts,
+            array("I", accumulate(building_counts, initial=0))[:-1],
+            building_counts,
+        ]
+        pop_columns = [
+            strings(list(chain.from_iterable(i.pop_types for i in provinces))),
+            array("i", chain.from_iterable(i.pop_amounts for i in provinces)),
+            strings(list(chain.from_iterable(i.pop_cultures for i in provinces))),
+            strings(list(chain.from_iterable(i.pop_religions for i in provinces))),
+        ]
+        building_columns = [
+            strings(list(chain.from_iterable(i.building_types for i in provinces))),
+            array("i", chain.from_iterable(i.building_counts for i in provinces)),
+        ]
+
+        writer.add("meta", "I", [self.version, writer.string(self.signature)])
+        for prefix, names, columns in (
+            ("file", self.FILE_ARRAYS, file_columns),
+            ("prov", self.PROVINCE_ARRAYS, province_columns),
+            ("pop", self.POP_ARRAYS, pop_columns),
+            ("bld", self.BUILDING_ARRAYS, building_columns),
+        ):
+            for (name, typecode), values in zip(names, columns):
+                writer.add(f"{prefix}.{name}", values.typecode, values)
+        writer.write(self.path)
+        self.changed = False
+
+
+def load_province_setup(path_to_setup, executor=None, cache_path=None):
+    # Parse every province setup file, the files are parsed with the shared parse pool by default.
+    # Provinces of files that haven't changed since the last start are loaded from a snapshot in the cache folder,
+    # pass cache_path="" to parse every file.
+    # Returns the parsed data of each province and the name of the file each province is in, both by province id
+    if executor is None:
+        executor = parse_pool
+    if cache_path is None:
+        cache_path = os.path.join(CACHE_PATH, "ProvinceSetup.cache")
+    pop_types = frozenset(settings.pop_types)
+    cache = ProvinceSetupCache(cache_path, pop_types) if cache_path else None
+    # Files are sorted so the same province wins every time when it is in more than one file
+    paths = sorted(path_to_setup.iterdir(), key=lambda path: path.name)
+    parsed_files = [None] * len(paths)
+    to_parse = list()
+    for i, path in enumerate(paths):
+        if cache is not None:
+            parsed_files[i] = cache.get(str(path))
+        if parsed_files[i] is None:
+            to_parse.append(i)
+    parsed = parse_province_files([paths[i] for i in to_parse], pop_types, executor)
+    for i, provinces in zip(to_parse, parsed):
+        parsed_files[i] = provinces
+        if cache is not None:
+            cache.set(str(paths[i]), provinces)
+    if cache is not None:
+        cache.save([str(path) for path in paths])
+
+    all_province_data, id_to_file_dict, duplicates = merge_province_files(
+        [path.name for path in paths], parsed_files
+    )
+    if duplicates:
+        message = "\n".join(
+            f"Province {province_id} is in {first} and {second}, the one in {second} is used"
+            for province_id, first, second in duplicates
+        )
+        warnings.warn(f"Duplicate province ids in {path_to_setup}:\n{message}")
+    return all_province_data, id_to_file_dict
+
+
+class ProvinceTable:
+    # Every province as a row of a pandas DataFrame so provinces can be filtered and aggregated without a python loop.
+    # Text fields and the setup file are categorical columns, the civilization value, barbarian power and the
+    # number of pops of each type and in total are numeric columns. The rows are indexed by province id.
+    TEXT_COLUMNS = [
+        "terrain",
+        "culture",
+        "religion",
+        "trade_goods",
+        "province_rank",
+        "holy_site",
+    ]
+    NUMERIC_COLUMNS = ["civilization_value", "barbarian_power"]
+
+    def __init__(self, provinces: dict, id_to_file: dict, pop_types=None):
+        if pop_types is None:
+            pop_types = settings.pop_types
+        self.pop_types = list(pop_types)
+        for province in provinces.values():
+            for pop_type in province.pop_types:
+                if pop_type not in self.pop_types:
+                    self.pop_types.append(pop_type)
+        records = list(provinces.values())
+        columns = {
+            column: pd.Categorical([getattr(i, column) for i in records])
+            for column in self.TEXT_COLUMNS
+        }
+        columns["file"] = pd.Categorical([id_to_file[i] for i in provinces])
+        for column in self.NUMERIC_COLUMNS:
+            columns[column] = pd.array(
+                [getattr(i, column) for i in records], dtype="int64"
+            )
+        pop_totals = self.get_pop_totals(records)
+        for i, pop_type in enumerate(self.pop_types):
+            columns[pop_type] = pop_totals[:, i]
+        columns["pops"] = pop_totals.sum(axis=1)
+        self.frame = pd.DataFrame(columns, index=pd.Index(list(provinces), name="province_id"))
+
+    def get_pop_totals(self, provinces):
+        # Return an array with a row for every province and the number of pops of every type in self.pop_types
+        rows = list()
+        pop_types = list()
+        amounts = array("i")
+        for i, province in enumerate(provinces):
+            rows.extend([i] * len(province.pop_types))
+            pop_types.extend(province.pop_types)
+            amounts.extend(province.pop_amounts)
+        codes = pd.Categorical(pop_types, categories=self.pop_types).codes
+        totals = np.zeros((len(provinces), len(self.pop_types)), dtype="int64")
+        np.add.at(totals, (rows, codes), amounts)
+        return totals
+
+    def update(self, provinces):
+        # Write edited ProvinceRecords back to their rows, all rows are set with one assignment per column
+        provinces = list(provinces)
+        if not provinces:
+            return
+        ids = [i.province_id for i in provinces]
+        for column in self.TEXT_COLUMNS:
+            values = [getattr(i, column) for i in provinces]
+            new_categories = set(values).difference(self.frame[column].cat.categories)
+            if new_categories:
+                self.frame[column] = self.frame[column].cat.add_categories(
+                    sorted(new_categories)
+                )
+            self.frame.loc[ids, column] = values
+        for column in self.NUMERIC_COLUMNS:
+            self.frame.loc[ids, column] = [getattr(i, column) for i in provinces]
+        for province in provinces:
+            for pop_type in province.pop_types:
+                if pop_type not in self.pop_types:
+                    self.pop_types.append(pop_type)
+                    self.frame.insert(len(self.frame.columns) - 1, pop_type, 0)
+        pop_totals = self.get_pop_totals(provinces)
+        for i, pop_type in enumerate(self.pop_types):
+            self.frame.loc[ids, pop_type] = pop_totals[:, i]
+        self.frame.loc[ids, "pops"] = pop_totals.sum(axis=1)
+
+    def mask(self, **conditions):
+        # Return a boolean Series of the rows that match every condition.
+        # A condition is a value, a list or set of values, or a function that takes the column and returns a mask
+        mask = pd.Series(True, index=self.frame.index)
+        for column, condition in conditions.items():
+            values = self.frame[column]
+            if callable(condition):
+                mask &= condition(values)
+            elif isinstance(condition, (list, tuple, set, frozenset)):
+                mask &= values.isin(condition)
+            else:
+                mask &= values == condition
+        return mask
+
+    def select(self, **conditions):
+        # Return the ids of the provinces that match every condition, see mask
+        #   province_table.select(culture="roman", province_rank=["city", "city_metropolis"])
+        #   province_table.select(civilization_value=lambda column: column >= 30)
+        return self.frame.index[self.mask(**conditions)].tolist()
+
+    def aggregate(self, by, column="pops", function="sum", **conditions):
+        # Return function of column for every value of by, over the provinces that match the conditions
+        #   province_table.aggregate("culture", "pops")
+        frame = self.frame[self.mask(**conditions)] if conditions else self.frame
+        return frame.groupby(by, observed=True)[column].agg(function)
 
 
 def split_loc_key(string):
@@ -403,7 +1086,7 @@ def save_all_changes():
         building_type = i.building_type
         building_count = i.building_count.get()
         if building_count and building_count > 0:
-            current_buildings.append((building_type, str(building_count)))
+            current_buildings.append((building_type, building_count))
 
     current_pops = list()
     for i in application.province_data_frame.pop_widgets:
@@ -412,127 +1095,276 @@ def save_all_changes():
         religion = i.popreligion.strip().lower()
         amount = i.popcount.get()
         if amount and amount > 0:
-            current_pops.append(
-                (
-                    poptype,
-                    [("culture", culture), ("religion", religion), ("amount", amount)],
-                )
-            )
+            current_pops.append((poptype, amount, culture, religion))
 
-    current_province_data = {
-        "province_id": current_pid.get(),
-        "province_name": current_province_name.get(),
-        "terrain": current_terrain,
-        "culture": current_culture,
-        "religion": current_religion,
-        "trade_good": current_trade_good,
-        "province_rank": current_province_rank,
-        "civ_value": current_civ_value,
-        "holy_site": current_holy_site,
-        "buildings": current_buildings,
-        "pops": current_pops,
-    }
+    # Barbarian power can't be edited in the province frame so it is kept from the last record of the province
+    if current_pid.get() in changed_provinces_data:
+        barbarian_power = changed_provinces_data[current_pid.get()].barbarian_power
+    else:
+        barbarian_power = all_province_data[current_pid.get()].barbarian_power
+    province = ProvinceRecord(
+        current_pid.get(),
+        terrain=current_terrain,
+        culture=current_culture,
+        religion=current_religion,
+        trade_goods=current_trade_good,
+        province_rank=current_province_rank,
+        civilization_value=current_civ_value,
+        barbarian_power=barbarian_power,
+        holy_site=current_holy_site,
+        pops=current_pops,
+        buildings=current_buildings,
+    )
 
-    changed_provinces_data[current_pid.get()] = current_province_data
+    province_names = application.province_data_frame.province_names
+    renamed = province_names.get(current_pid.get()) != current_province_name.get()
+    province_names[current_pid.get()] = current_province_name.get()
+    if renamed:
+        renamed_provinces.add(current_pid.get())
+
+    # Callbacks mark a province as changed even when a value is set to what it already was,
+    # so the file is only written when the data or the name of the province really changed
+    changed = current_pid.get() in changed_provinces and set_province_record(province)
+    if changed:
+        if province_table is not None:
+            province_table.update([province])
+        application.show_change_count()
+    if changed or renamed:
+        province_writer.mark_dirty([id_to_file_dict[current_pid.get()]])
+
+
+def set_province_record(province):
+    # Store the latest record of an edited province and compare it field by field with its setup file.
+    # Returns True if the province has to be written again, when its data is different from what was stored before.
+    province_id = province.province_id
+    if province_id in modified_provinces:
+        previous = changed_provinces_data[province_id]
+    else:
+        previous = all_province_data[province_id]
+    changed_provinces_data[province_id] = province
+    if province == all_province_data[province_id]:
+        modified_provinces.discard(province_id)
+    else:
+        modified_provinces.add(province_id)
+    return province != previous
 
-    application.province_data_frame.province_names[
-        current_pid.get()
-    ] = current_province_name.get()
 
-    if current_pid.get() in changed_provinces:
-        file_to_write = id_to_file_dict[current_pid.get()]
-        provinces_to_write = [
-            k for k, v in id_to_file_dict.items() if v == file_to_write
-        ]
-        Path("output").mkdir(parents=True, exist_ok=True)
-        # Write the file
-        with open("output/" + file_to_write, "w") as file:
-            for i in provinces_to_write:
-                if i in changed_provinces:
-                    province_data = changed_provinces_data[i]
-                    file.write(get_province_output(province_data))
+def get_real_changes():
+    # Return the number of provinces whose data is different from their setup file
+    # and the number of fields that are different in those provinces
+    field_count = sum(
+        len(changed_provinces_data[i].changed_fields(all_province_data[i]))
+        for i in modified_provinces
+    )
+    return len(modified_provinces), field_count
+
+
+def get_provinces_by_file(id_to_file):
+    # Return the ids of the provinces in each setup file by file name, in the order they were parsed
+    provinces_by_file = dict()
+    for province_id, file_name in id_to_file.items():
+        provinces_by_file.setdefault(file_name, list()).append(province_id)
+    return provinces_by_file
+
+
+class ProvinceFileWriter:
+    # Writes the setup files of edited provinces to the output folder from a background thread.
+    # Files are marked dirty on the UI thread, which never touches the disk. The thread waits until no file has been
+    # marked for delay seconds and then writes every dirty file once, so a burst of saves is coalesced into one write.
+    # Only provinces in modified_provinces or renamed_provinces are written again, everything else is copied from the setup file
+    # in path_to_setup byte for byte, so comments, formatting and fields the editor doesn't know about are kept and diffs stay small.
+    # Files are written with atomic_write. A file that can't be written stays dirty and is tried again by the next flush,
+    # the error is kept in errors until it is written.
+    def __init__(self, province_names, path_to_setup, output_path="output", delay=0.5):
+        self.province_names = province_names
+        self.path_to_setup = path_to_setup
+        self.output_path = output_path
+        self.delay = delay
+        # Reverse of id_to_file_dict so a file is written without looking at every province
+        self.provinces_by_file = get_provinces_by_file(id_to_file_dict)
+        self.dirty = set()
+        # Last error of every file that couldn't be written, by file name
+        self.errors = dict()
+        self.lock = threading.Lock()
+        # Only one thread writes files at a time, flush can be called while the background thread is writing
+        self.write_lock = threading.Lock()
+        self.marked = threading.Event()
+        self.stopped = False
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        # Stop the background thread and write whatever is still dirty, files that failed before are tried once more.
+        # Returns the errors of the files that still couldn't be written by file name.
+        self.stopped = True
+        self.marked.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self.flush()
+        with self.lock:
+            errors = dict(self.errors)
+        if errors:
+            message = "\n".join(f"{i}: {e}" for i, e in sorted(errors.items()))
+            warnings.warn(f"Province setup files that couldn't be written:\n{message}")
+        return errors
+
+    def mark_dirty(self, file_names):
+        with self.lock:
+            self.dirty.update(file_names)
+        self.marked.set()
+
+    def run(self):
+        while not self.stopped:
+            self.marked.wait()
+            # Keep waiting while files are still being marked
+            while not self.stopped and self.marked.is_set():
+                self.marked.clear()
+                time.sleep(self.delay)
+            if not self.stopped:
+                self.flush()
+
+    def flush(self):
+        # Write every dirty file now
+        with self.write_lock:
+            with self.lock:
+                file_names = sorted(self.dirty)
+                self.dirty = set()
+            for file_name in file_names:
+                try:
+                    self.write_file(file_name)
+                except OSError as e:
+                    print(e)
+                    # Keep the file dirty so the next flush, or stop, writes it again
+                    with self.lock:
+                        self.dirty.add(file_name)
+                        self.errors[file_name] = e
                 else:
-                    current_data = all_province_data[i]
-                    pops, buildings = get_pops_and_buildings(current_data)
-                    province_data = ProvinceData(current_data)
-                    try:
-                        name = application.province_data_frame.province_names[
-                            province_data.province_id
-                        ]
-                    except KeyError:
-                        name = f"EMPTY LOC - {province_data.province_id}"
-                    province_data = {
-                        "province_id": province_data.province_id,
-                        "province_name": name,
-                        "terrain": province_data.terrain,
-                        "culture": province_data.culture,
-                        "religion": province_data.religion,
-                        "trade_good": province_data.trade_goods,
-                        "province_rank": province_data.province_rank,
-                        "civ_value": province_data.civilization_value,
-                        "holy_site": province_data.holy_site,
-                        "buildings": buildings,
-                        "pops": pops,
-                    }
-                    file.write(get_province_output(province_data))
+                    with self.lock:
+                        self.errors.pop(file_name, None)
+
+    def get_province_output(self, province_id, original=None):
+        if province_id in modified_provinces:
+            province = changed_provinces_data[province_id]
+        else:
+            province = all_province_data[province_id]
+        name = self.province_names.get(province_id, f"EMPTY LOC - {province_id}")
+        extra_entries = get_extra_entries(original) if original is not None else ()
+        return get_province_output(province, name, extra_entries)
+
+    def get_file_output(self, file_name):
+        # Return the bytes of a setup file with the blocks of edited provinces replaced.
+        # Every province is written again if the setup file can't be read anymore.
+        try:
+            with open(os.path.join(self.path_to_setup, file_name), "rb") as file:
+                data = file.read()
+            text = data.decode("utf-8-sig")
+        except (OSError, UnicodeDecodeError):
+            output = "".join(
+                self.get_province_output(i) for i in self.provinces_by_file[file_name]
+            )
+            return codecs.BOM_UTF8 + output.encode("utf-8")
+
+        newline = "\r\n" if "\r\n" in text else "\n"
+        # The last block of a province that is in the file more than once is the one that was parsed
+        blocks = {i: (start, end) for i, start, end in get_province_offsets(text)}
+        edited = [
+            i
+            for i in self.provinces_by_file[file_name]
+            if i in modified_provinces or i in renamed_provinces
+        ]
+        output = list()
+        position = 0
+        replaced = sorted(blocks[i] + (i,) for i in edited if i in blocks)
+        for start, end, province_id in replaced:
+            output.append(text[position:start])
+            province = self.get_province_output(province_id, text[start:end])
+            output.append(province.rstrip("\n").replace("\n", newline))
+            position = end
+        output.append(text[position:])
+        # Provinces that aren't in the setup file anymore, because it was changed after it was loaded,
+        # are added at the end so their edits aren't lost
+        missing = [i for i in edited if i not in blocks]
+        if missing and not text.endswith("\n"):
+            output.append(newline)
+        for province_id in missing:
+            output.append(self.get_province_output(province_id).replace("\n", newline))
+        bom = codecs.BOM_UTF8 if data.startswith(codecs.BOM_UTF8) else b""
+        return bom + "".join(output).encode("utf-8")
+
+    def write_file(self, file_name):
+        output = self.get_file_output(file_name)
+        with atomic_write(os.path.join(self.output_path, file_name)) as file:
+            file.write(output)
+
+
+def edit_provinces(province_ids, assignments, writer):
+    # Set the fields in assignments on every province in province_ids in one batch.
+    # The provinces are marked as changed, the province table is updated once and every setup file
+    # with a province whose data really changed is marked dirty once in writer.
+    # Returns the records of the provinces whose data changed.
+    edited = list()
+    for province_id in province_ids:
+        # The province that is shown can be in changed_provinces before its record is stored
+        province = (
+            changed_provinces_data.get(province_id) or all_province_data[province_id]
+        )
+        province = province.replace(**assignments)
+        changed_provinces.add(province_id)
+        if set_province_record(province):
+            edited.append(province)
+    if edited:
+        if province_table is not None:
+            province_table.update(edited)
+        writer.mark_dirty({id_to_file_dict[i.province_id] for i in edited})
+    return edited
+
+
+def bulk_edit_provinces(assignments, province_ids=None, **conditions):
+    # Edit every province in province_ids, or every province in the province table that matches conditions,
+    # from the editor. The province that is shown is saved first and shown again with the new values.
+    #   bulk_edit_provinces({"culture": "roman"}, culture="greek", province_rank="city")
+    #   bulk_edit_provinces({"trade_goods": "grain", "civilization_value": 20}, ["1", "2", "3"])
+    if province_ids is None:
+        province_ids = province_table.select(**conditions)
+    save_all_changes()
+    edited = edit_provinces(province_ids, assignments, province_writer)
+    application.show_change_count()
+    current_pid = application.province_data_frame.province_id.get()
+    if current_pid in province_ids:
+        set_province_dataframe_from_id(current_pid)
+    return edited
 
 
 def set_province_dataframe_from_id(province_id):
     if province_id in changed_provinces:
-        new_province_data = changed_provinces_data[province_id]
+        province = changed_provinces_data[province_id]
     else:
-        current_data = all_province_data[province_id]
-        new_pops, new_buildings = get_pops_and_buildings(current_data)
-        province_data = ProvinceData(current_data)
-
-        new_province_data = {
-            "province_id": province_data.province_id,
-            "terrain": province_data.terrain,
-            "culture": province_data.culture,
-            "religion": province_data.religion,
-            "trade_good": province_data.trade_goods,
-            "province_rank": province_data.province_rank,
-            "civilization_value": province_data.civilization_value,
-            "holy_site": province_data.holy_site,
-            "buildings": new_buildings,
-            "pops": new_pops,
-        }
+        province = all_province_data[province_id]
 
     application.province_data_frame.startup_complete = False
     application.province_data_frame.province_id = tk.StringVar(
-        value=new_province_data["province_id"]
+        value=province.province_id
     )
     application.province_data_frame.set_province_id_to_name()
-    application.province_data_frame.terrain = tk.StringVar(
-        value=new_province_data["terrain"]
-    )
-    application.province_data_frame.culture = tk.StringVar(
-        value=new_province_data["culture"]
-    )
-    application.province_data_frame.religion = tk.StringVar(
-        value=new_province_data["religion"]
-    )
+    application.province_data_frame.terrain = tk.StringVar(value=province.terrain)
+    application.province_data_frame.culture = tk.StringVar(value=province.culture)
+    application.province_data_frame.religion = tk.StringVar(value=province.religion)
     application.province_data_frame.trade_good = tk.StringVar(
-        value=new_province_data["trade_good"]
+        value=province.trade_goods
     )
     application.province_data_frame.province_rank = tk.StringVar(
-        value=new_province_data["province_rank"]
+        value=province.province_rank
     )
-
-    if province_id in changed_provinces:
-        application.province_data_frame.civ_value = tk.IntVar(
-            value=int(new_province_data["civ_value"])
-        )
-    else:
-        application.province_data_frame.civ_value = tk.IntVar(
-            value=int(new_province_data["civilization_value"])
-        )
-
-    application.province_data_frame.holy_site = tk.StringVar(
-        value=new_province_data["holy_site"]
+    application.province_data_frame.civ_value = tk.IntVar(
+        value=province.civilization_value
     )
-    application.province_data_frame.buildings = new_province_data["buildings"]
-    application.province_data_frame.pops = new_province_data["pops"]
+    application.province_data_frame.holy_site = tk.StringVar(value=province.holy_site)
+    application.province_data_frame.buildings = province.buildings()
+    application.province_data_frame.pops = province.pops()
 
     application.province_data_frame.province_name_entry.delete("0", tk.END)
     application.province_data_frame.province_name_entry.insert(
@@ -574,7 +1406,7 @@ def set_province_dataframe_from_id(province_id):
 
     application.province_data_frame.building_widgets = list()
     for i in application.province_data_frame.buildings:
-        application.province_data_frame.create_building(i[0], i[1])
+        application.province_data_frame.create_building(*i)
 
     # Destroy the existing pop widgets and recreate new ones
     for i in application.province_data_frame.pop_widgets:
@@ -582,9 +1414,7 @@ def set_province_dataframe_from_id(province_id):
 
     application.province_data_frame.pop_widgets = list()
     for i in application.province_data_frame.pops:
-        application.province_data_frame.create_pop(
-            i[0], i[1][2][1], i[1][0][1], i[1][1][1]
-        )
+        application.province_data_frame.create_pop(*i)
 
     application.province_data_frame.startup_complete = True
 
@@ -1357,10 +2187,11 @@ class AddBuildingsFrame(customtkinter.CTkFrame):
             border_color="#DCE4EE",
             x_offset=-40,
         )
-        CTkScrollableDropdown(
+        self.building_dropdown = CTkScrollableDropdown(
             self.building_combobox,
             command=self.building_dropdown_callback,
             values=settings.buildings,
+            search=search_game_object("buildings"),
             justify="left",
             button_color="transparent",
             autocomplete=True,
@@ -1406,6 +2237,11 @@ class AddBuildingsFrame(customtkinter.CTkFrame):
         self.building_combobox.set(self.building_type.get())
         self.update_tooltip()
 
+    def update_game_object_values(self, name, keys):
+        if name == "buildings":
+            self.building_combobox.configure(values=keys)
+            self.building_dropdown.configure(values=keys)
+
 
 class AddPopsFrame(customtkinter.CTkFrame):
     def __init__(self, master, **kwargs):
@@ -1485,10 +2321,11 @@ class AddPopsFrame(customtkinter.CTkFrame):
             border_color="#DCE4EE",
             x_offset=-40,
         )
-        CTkScrollableDropdown(
+        self.culture_dropdown = CTkScrollableDropdown(
             self.culture,
             command=self.culture_dropdown_callback,
             values=self.culture_list,
+            search=search_game_object("cultures"),
             justify="left",
             button_color="transparent",
             autocomplete=True,
@@ -1518,10 +2355,11 @@ class AddPopsFrame(customtkinter.CTkFrame):
             border_color="#DCE4EE",
             x_offset=-40,
         )
-        CTkScrollableDropdown(
+        self.religion_dropdown = CTkScrollableDropdown(
             self.religion,
             command=self.religion_dropdown_callback,
             values=self.religion_list,
+            search=search_game_object("religions"),
             justify="left",
             button_color="transparent",
             autocomplete=True,
@@ -1603,9 +2441,20 @@ class AddPopsFrame(customtkinter.CTkFrame):
         self.pop_count_out = int(value)
         self.update_tooltip()
 
+    def update_game_object_values(self, name, keys):
+        # Pop type radio buttons are only made on startup so new pop types show up after a restart
+        if name == "cultures":
+            self.culture_list = [""] + keys
+            self.culture.configure(values=self.culture_list)
+            self.culture_dropdown.configure(values=self.culture_list)
+        elif name == "religions":
+            self.religion_list = [""] + keys
+            self.religion.configure(values=self.religion_list)
+            self.religion_dropdown.configure(values=self.religion_list)
+
 
 class ProvinceDataFrame(customtkinter.CTkScrollableFrame):
-    def __init__(self, master, province_data: dict, **kwargs):
+    def __init__(self, master, province_data: ProvinceRecord, **kwargs):
         super().__init__(master, **kwargs)
         content_x = (60, 0)
         label_fontsize = 14
@@ -1614,17 +2463,17 @@ class ProvinceDataFrame(customtkinter.CTkScrollableFrame):
         self.pop_widgets = list()
         self.building_widgets = list()
 
-        self.province_id = tk.StringVar(value=province_data["province_id"])
-        self.terrain = tk.StringVar(value=province_data["terrain"])
-        self.culture = tk.StringVar(value=province_data["culture"])
-        self.religion = tk.StringVar(value=province_data["religion"])
-        self.trade_good = tk.StringVar(value=province_data["trade_good"])
-        self.province_rank = tk.StringVar(value=province_data["province_rank"])
-        self.holy_site = tk.StringVar(value=province_data["holy_site"])
-        self.pops = province_data["pops"]
-        self.buildings = province_data["buildings"]
+        self.province_id = tk.StringVar(value=province_data.province_id)
+        self.terrain = tk.StringVar(value=province_data.terrain)
+        self.culture = tk.StringVar(value=province_data.culture)
+        self.religion = tk.StringVar(value=province_data.religion)
+        self.trade_good = tk.StringVar(value=province_data.trade_goods)
+        self.province_rank = tk.StringVar(value=province_data.province_rank)
+        self.holy_site = tk.StringVar(value=province_data.holy_site)
+        self.pops = province_data.pops()
+        self.buildings = province_data.buildings()
         # Slider values need to be IntVar
-        self.civ_value = tk.IntVar(value=province_data["civilization_value"])
+        self.civ_value = tk.IntVar(value=province_data.civilization_value)
 
         self.current_open_buildings_row = 15
         self.current_open_pops_row = 2001
@@ -1668,9 +2517,10 @@ class ProvinceDataFrame(customtkinter.CTkScrollableFrame):
             variable=self.terrain,
         )
         self.terrain_box.grid(row=4, column=0, padx=content_x, pady=(20, 0))
-        CTkScrollableDropdown(
+        self.terrain_dropdown = CTkScrollableDropdown(
             self.terrain_box,
             values=settings.terrain_types,
+            search=search_game_object("terrain_types"),
             justify="left",
             button_color="transparent",
             autocomplete=True,
@@ -1696,10 +2546,11 @@ class ProvinceDataFrame(customtkinter.CTkScrollableFrame):
             variable=self.culture,
         )
         self.culture_box.grid(row=5, column=0, padx=content_x, pady=(20, 0))
-        CTkScrollableDropdown(
+        self.culture_dropdown = CTkScrollableDropdown(
             self.culture_box,
             command=self.culture_dropdown_callback,
             values=settings.cultures,
+            search=search_game_object("cultures"),
             justify="left",
             button_color="transparent",
             autocomplete=True,
@@ -1725,10 +2576,11 @@ class ProvinceDataFrame(customtkinter.CTkScrollableFrame):
             variable=self.religion,
         )
         self.religion_box.grid(row=6, column=0, padx=content_x, pady=(20, 0))
-        CTkScrollableDropdown(
+        self.religion_dropdown = CTkScrollableDropdown(
             self.religion_box,
             command=self.religion_dropdown_callback,
             values=settings.religions,
+            search=search_game_object("religions"),
             justify="left",
             button_color="transparent",
             autocomplete=True,
@@ -1754,10 +2606,11 @@ class ProvinceDataFrame(customtkinter.CTkScrollableFrame):
             variable=self.trade_good,
         )
         self.trade_good_box.grid(row=7, column=0, padx=content_x, pady=(20, 0))
-        CTkScrollableDropdown(
+        self.trade_good_dropdown = CTkScrollableDropdown(
             self.trade_good_box,
             command=self.trade_good_dropdown_callback,
             values=settings.trade_goods,
+            search=search_game_object("trade_goods"),
             justify="left",
             button_color="transparent",
             autocomplete=True,
@@ -1782,10 +2635,11 @@ class ProvinceDataFrame(customtkinter.CTkScrollableFrame):
             variable=self.province_rank,
         )
         self.province_rank_box.grid(row=8, column=0, padx=content_x, pady=(20, 0))
-        CTkScrollableDropdown(
+        self.province_rank_dropdown = CTkScrollableDropdown(
             self.province_rank_box,
             command=self.province_rank_dropdown_callback,
             values=settings.province_ranks,
+            search=search_game_object("province_ranks"),
             justify="left",
             button_color="transparent",
             scrollbar=False,
@@ -1843,22 +2697,19 @@ class ProvinceDataFrame(customtkinter.CTkScrollableFrame):
         )
         self.buildings_label.grid(row=13, column=0, padx=(0, 0), pady=(10, 5))
         for i in self.buildings:
-            self.create_building(i[0], i[1])
+            self.create_building(*i)
 
         # Create add buildings frame
-        self.add_pops_frame = AddBuildingsFrame(self)
-        self.add_pops_frame.grid(row=2000, column=0, padx=(12, 9), pady=(4, 10))
+        self.add_buildings_frame = AddBuildingsFrame(self)
+        self.add_buildings_frame.grid(row=2000, column=0, padx=(12, 9), pady=(4, 10))
 
         # Population widgets
 
         # Pops look like this when they get here:
         # [
-        #     ("citizen", [("culture", "hebrew"), ("religion", "judaism"), ("amount", "4")]),
-        #     ("nobles", [("culture", ""), ("religion", ""), ("amount", "5")]),
-        #     ("citizen", [("culture", ""), ("religion", ""), ("amount", "20")]),
-        #     ("freemen", [("culture", ""), ("religion", ""), ("amount", "21")]),
-        #     ("slaves", [("culture", ""), ("religion", ""), ("amount", "4")]),
-        #     ("tribesmen", [("culture", ""), ("religion", ""), ("amount", "4")]),
+        #     ("citizen", 4, "hebrew", "judaism"),
+        #     ("nobles", 5, "", ""),
+        #     ("freemen", 21, "", ""),
         # ]
 
         self.pops_label = customtkinter.CTkLabel(
@@ -1869,7 +2720,7 @@ class ProvinceDataFrame(customtkinter.CTkScrollableFrame):
         self.pops_label.grid(row=9000, column=0, padx=(0, 0), pady=(10, 5))
 
         for i in self.pops:
-            self.create_pop(i[0], i[1][2][1], i[1][0][1], i[1][1][1])
+            self.create_pop(*i)
 
         # Create add pops frame
         self.add_pops_frame = AddPopsFrame(self)
@@ -1986,6 +2837,21 @@ class ProvinceDataFrame(customtkinter.CTkScrollableFrame):
         self.pop_widgets.append(new_pop)
         self.set_changed()
 
+    def update_game_object_values(self, name, keys):
+        # Set new values for the comboboxes of a GameObject that was reloaded
+        widgets = {
+            "terrain_types": (self.terrain_box, self.terrain_dropdown),
+            "cultures": (self.culture_box, self.culture_dropdown),
+            "religions": (self.religion_box, self.religion_dropdown),
+            "trade_goods": (self.trade_good_box, self.trade_good_dropdown),
+            "province_ranks": (self.province_rank_box, self.province_rank_dropdown),
+        }
+        if name in widgets:
+            for widget in widgets[name]:
+                widget.configure(values=keys)
+        self.add_buildings_frame.update_game_object_values(name, keys)
+        self.add_pops_frame.update_game_object_values(name, keys)
+
     def create_building(self, name, amount):
         # Create a new pop frame
         self.current_open_buildings_row += 1
@@ -2357,6 +3223,65 @@ class SearchWindow(customtkinter.CTkToplevel):
         self.destroy()
 
 
+class ReferenceSearchWindow(customtkinter.CTkToplevel):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self.title("Find References")
+        self.geometry("700x450")
+
+        self.key = tk.StringVar(value="")
+
+        self.rowconfigure(1, weight=1)
+        self.columnconfigure(0, weight=1)
+
+        # Key editbox
+        self.key_entry = customtkinter.CTkEntry(
+            self,
+            placeholder_text="Culture, religion, trade good, building...",
+            textvariable=self.key,
+            justify="left",
+        )
+        self.key_entry.grid(row=0, column=0, padx=(10, 5), pady=10, sticky="ew")
+        self.confirm_button = customtkinter.CTkButton(
+            self,
+            width=120,
+            text="Find",
+            command=self.confirm_callback,
+            fg_color="transparent",
+            border_width=2,
+            text_color=("gray10", "#DCE4EE"),
+        )
+        self.confirm_button.grid(row=0, column=1, padx=(5, 10), pady=10)
+
+        # Results, one file and line per row
+        self.results = customtkinter.CTkTextbox(self, wrap="none")
+        self.results.grid(
+            row=1, column=0, columnspan=2, padx=10, pady=(0, 10), sticky="nsew"
+        )
+        self.results.configure(state="disabled")
+
+        self.key_entry.bind("<Return>", self.key_callback)
+        self.key_entry.focus()
+
+    def key_callback(self, event):
+        self.confirm_callback()
+
+    def confirm_callback(self):
+        key = self.key.get().strip()
+        references = reference_index.get(key) if reference_index is not None else []
+
+        lines = [f"{len(references)} references to {key}"]
+        if reference_index is None or reference_index.update_lock.locked():
+            lines[0] += " (game files are still being indexed)"
+        lines += [f"{path}:{line}" for path, line in references]
+
+        self.results.configure(state="normal")
+        self.results.delete("1.0", "end")
+        self.results.insert("1.0", "\n".join(lines))
+        self.results.configure(state="disabled")
+
+
 class CustomMapWindow(customtkinter.CTkToplevel):
     def __init__(self, image_path, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -2389,9 +3314,10 @@ class App(customtkinter.CTk):
         super().__init__()
 
         self.province_map = True
+        self.game_file_watcher = None
 
         # Configure window
-        self.title("Imperator Province Data Editor ")
+        self.show_change_count()
         self.geometry(f"{1700}x{880}")
 
         # Configure grid layout
@@ -2405,24 +3331,7 @@ class App(customtkinter.CTk):
         except KeyError:
             first_key = next(iter(all_province_data))
             current_data = all_province_data[first_key]
-        pops, buildings = get_pops_and_buildings(current_data)
-        province_data = ProvinceData(current_data)
-
-        default_province_data = {
-            "province_id": province_data.province_id,
-            "terrain": province_data.terrain,
-            "culture": province_data.culture,
-            "religion": province_data.religion,
-            "trade_good": province_data.trade_goods,
-            "province_rank": province_data.province_rank,
-            "civilization_value": province_data.civilization_value,
-            "holy_site": province_data.holy_site,
-            "buildings": buildings,
-            "pops": pops,
-        }
-        self.province_data_frame = ProvinceDataFrame(
-            self, default_province_data, height=1000
-        )
+        self.province_data_frame = ProvinceDataFrame(self, current_data, height=1000)
 
         # Create province map
         self.province_frame = customtkinter.CTkFrame(self, height=1000)
@@ -2444,6 +3353,7 @@ class App(customtkinter.CTk):
 
         self.settings = None
         self.search = None
+        self.reference_search = None
         self.custom_map = None
 
         self.map_dropdown = CustomDropdownMenu(widget=map_button)
@@ -2472,12 +3382,18 @@ class App(customtkinter.CTk):
             option="Open Province Search",
             command=lambda: self.open_search(),
         )
+        self.search_dropdown.add_option(
+            option="Find References",
+            command=lambda: self.open_reference_search(),
+        )
 
         self.settings_dropdown.add_option(
             option="Open Settings",
             command=lambda: self.open_settings(),
         )
 
+        self.after(500, self.update_game_objects)
+
     def open_settings(self):
         if self.settings is None or not self.settings.winfo_exists():
             self.settings = SettingsWindow(self)
@@ -2490,6 +3406,12 @@ class App(customtkinter.CTk):
         else:
             self.search.focus()
 
+    def open_reference_search(self):
+        if self.reference_search is None or not self.reference_search.winfo_exists():
+            self.reference_search = ReferenceSearchWindow(self)
+        else:
+            self.reference_search.focus()
+
     def change_map(self):
         image_path = filedialog.askopenfilename()
         if not image_path:
@@ -2549,6 +3471,17 @@ class App(customtkinter.CTk):
             self.grid_propagate(False)
             self.province_map = False
 
+    def update_game_objects(self):
+        # Apply the keys of GameObjects that were reloaded by the file watcher
+        while True:
+            try:
+                name, keys = game_object_updates.get_nowait()
+            except queue.Empty:
+                break
+            setattr(settings, name, keys)
+            self.province_data_frame.update_game_object_values(name, keys)
+        self.after(500, self.update_game_objects)
+
     def load_map_wrapper(self, i, mode):
         # Needs a wrapper function because lambda in for loops always uses the last value
         def load_map_callback(event=""):
@@ -2556,15 +3489,48 @@ class App(customtkinter.CTk):
 
         return load_map_callback
 
+    def show_change_count(self):
+        # Show how many provinces and fields really differ from the setup files in the title
+        province_count, field_count = get_real_changes()
+        if province_count:
+            self.title(
+                f"Imperator Province Data Editor - {province_count} provinces changed ({field_count} fields)"
+            )
+        else:
+            self.title("Imperator Province Data Editor ")
+
     def on_close(self):
         # Save all the changes made to provinces and localization
         # application.destroy() has to execute to close the app so we just except everything here to ensure it happens so you don't get stuck in the app if there is an error.
 
         loc_keys = list()
+        try:
+            if self.game_file_watcher is not None:
+                self.game_file_watcher.stop()
+            # Save the updates the file watcher made, unless the index is still being updated in the background
+            if (
+                reference_index is not None
+                and reference_index.changed
+                and not reference_index.update_lock.locked()
+            ):
+                reference_index.save()
+        except Exception as e:
+            print(e)
         try:
             save_all_changes()
         except Exception as e:
             print(e)
+        try:
+            errors = province_writer.stop()
+            if errors:
+                # The packaged app has no console, so tell the user which edits weren't saved before the window closes
+                messagebox.showerror(
+                    "Province files not saved",
+                    "These province setup files couldn't be written to the output folder:\n\n"
+                    + "\n".join(f"{i}: {e}" for i, e in sorted(errors.items())),
+                )
+        except Exception as e:
+            print(e)
         try:
             for i, province in enumerate(
                 application.province_data_frame.province_names
@@ -2580,7 +3546,7 @@ class App(customtkinter.CTk):
                         if int(item) == i + 1:
                             loc_key = (
                                 f"PROV{i+1}: "
-                                + f'"{changed_provinces_data[item]["province_name"]}"'
+                                + f'"{application.province_data_frame.province_names[item]}"'
                             )
                 if loc_key and "EMPTY LOC" not in loc_key:
                     loc_keys.append(loc_key)
@@ -2597,10 +3563,13 @@ class App(customtkinter.CTk):
 
 
 if __name__ == "__main__":
-    global all_province_data, application
+    global application
 
-    # Load game data from mods and vanilla
-    add_game_objects_to_settings()
+    # Needed for the process pool used to parse game files when the app is built into an exe
+    multiprocessing.freeze_support()
+
+    # Load game data from mods and vanilla in the background
+    game_object_loader = add_game_objects_to_settings()
 
     # Parse all province setup data
     path_to_setup = Path(settings.path_to_mod + "/setup/provinces")
@@ -2616,18 +3585,12 @@ if __name__ == "__main__":
         )
         raise NotADirectoryError(error)
 
-    all_province_data = dict()
-    id_to_file_dict = dict()
+    # Parsing province setup files only needs pop types, the other types keep loading while the files are parsed
+    game_object_loader.result("pop_types")
 
     try:
-        for filename in path_to_setup.iterdir():
-            with open(filename, "r", encoding="utf-8-sig") as file:
-                text = file.read()
-            data = get_provinces_in_file(text)
-            for i in data:
-                parsed_data = parse_province_data(i)
-                all_province_data[parsed_data[0][1]] = parsed_data
-                id_to_file_dict[parsed_data[0][1]] = filename.name
+        all_province_data, id_to_file_dict = load_province_setup(path_to_setup)
+        province_table = ProvinceTable(all_province_data, id_to_file_dict)
     except:
         error = (
             "There was an error parsing the province setup files."
@@ -2641,7 +3604,17 @@ if __name__ == "__main__":
         error = "There was an error loading province definitions. Make sure the definition.csv is formatted in the same way as the base game."
         raise RuntimeError(error)
 
+    # Every type is needed to create the widgets
+    game_object_loader.wait()
+    shutdown_parse_pool()
+    reference_index = start_reference_index()
+
     application = App()
+    province_writer = ProvinceFileWriter(
+        application.province_data_frame.province_names, path_to_setup
+    )
+    province_writer.start()
+    application.game_file_watcher = watch_game_objects(reference_index)
     if OS == "Windows":
         application.after(0, lambda: application.state("zoomed"))
     application.protocol("WM_DELETE_WINDOW", application.on_close)